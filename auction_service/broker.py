@@ -0,0 +1,39 @@
+import logging
+import uuid
+
+from faststream.rabbit import ExchangeType, RabbitExchange, RabbitQueue
+from faststream.rabbit.fastapi import RabbitRouter
+
+import schemas
+from config import settings
+
+
+router = RabbitRouter(settings.rabbitmq_url)
+
+# События аукционов (ставка, смена статуса): topic-обменник с ключом auction.<id>.
+# У каждого воркера своя эксклюзивная очередь — событие доходит до всех воркеров,
+# а внутри воркера раздаётся подписчикам SSE/WebSocket (utils/price_stream.py)
+AUCTION_EVENTS_EXCHANGE = RabbitExchange("auction.events", type=ExchangeType.TOPIC)
+auction_events_queue = RabbitQueue(
+    f"auction.events.{uuid.uuid4().hex}", exclusive=True, auto_delete=True,
+    routing_key="auction.*",
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def publish_auction_event(event: schemas.AuctionEvent) -> bool:
+    """
+    Публикует событие аукциона для всех воркеров.
+    Недоступность брокера не должна ломать ставку — ошибка только логируется.
+    """
+    try:
+        await router.broker.publish(
+            event.model_dump(mode="json"),
+            exchange=AUCTION_EVENTS_EXCHANGE,
+            routing_key=f"auction.{event.auction_id}",
+        )
+    except Exception:
+        logger.exception("Failed to publish auction %s event", event.auction_id)
+        return False
+    return True
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, func, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, func, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship, Mapped, mapped_column
 from datetime import timedelta
 
@@ -17,8 +17,17 @@ class Auction(Base):
     status: Mapped[str] = mapped_column(String, default="scheduled")
     winner_external_id: Mapped[str] = mapped_column(String, default='')  # ID из auth_service
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Денормализация: обновляются в транзакции принятой ставки
+    bid_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # FK отложенный: цена и top_bid_id обновляются раньше, чем вставляется сама ставка
+    top_bid_id: Mapped[int | None] = mapped_column(
+        Integer,
+        ForeignKey("bids.id", name="fk_auctions_top_bid_id", use_alter=True,
+                   deferrable=True, initially="DEFERRED"),
+        nullable=True,
+    )
 
-    bids = relationship("Bid", back_populates="auction")
+    bids = relationship("Bid", back_populates="auction", foreign_keys="Bid.auction_id")
 
 
 class Bid(Base):
@@ -30,4 +39,9 @@ class Bid(Base):
     amount: Mapped[float] = mapped_column(Float)
     timestamp: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
 
-    auction = relationship("Auction", back_populates="bids")
+    auction = relationship("Auction", back_populates="bids", foreign_keys=[auction_id])
+
+    __table_args__ = (
+        # История ставок аукциона от старшей к младшей и выбор победителя
+        Index("ix_bids_auction_id_amount", "auction_id", amount.desc(), id.desc()),
+    )
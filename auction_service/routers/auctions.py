@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select, and_, or_
 import models, schemas
 import aiohttp
+from config import settings
 from database import AsyncSession, get_db
+from utils.price_stream import price_hub
+from utils.scheduler import auction_scheduler
 
 router = APIRouter()
 
+# Keep-alive сообщение WebSocket-потока (по нему же сервер замечает отключение)
+WEBSOCKET_PING = '{"type": "ping"}'
+
 LOST_ITEMS_SERVICE_URL = "http://lostfound_service:8000/api/lost_items/"  # Замените на URL вашего сервиса
 
 @router.post("/", response_model=schemas.Auction)
@@ -23,6 +32,14 @@ async def create_auction(auction: schemas.AuctionCreate, db: AsyncSession = Depe
     db.add(db_auction)
     await db.commit()
     await db.refresh(db_auction)
+
+    # Ставим аукцион в расписание: сразу, если планировщик в этом воркере,
+    # и через событие — если в другом
+    auction_scheduler.notify(db_auction.id)
+    await price_hub.publish(schemas.AuctionEvent(
+        type="status", auction_id=db_auction.id,
+        current_price=db_auction.current_price, status=db_auction.status,
+    ))
     return db_auction
 
 
@@ -47,3 +64,86 @@ async def get_auctions(
     results = await db.execute(query)
     auctions = results.scalars().all()
     return auctions
+
+
+async def _auction_events(auction_id: int, first_event: schemas.AuctionEvent):
+    """
+    События аукциона для одного подписчика: сначала текущая цена,
+    потом всё, что приходит в price_hub. None — пауза без событий (keep-alive).
+    """
+    async with price_hub.subscribe(auction_id) as queue:
+        yield first_event
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), settings.stream_heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+@router.get("/{auction_id}/stream")
+async def stream_auction(auction_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Поток цены и ставок аукциона (Server-Sent Events).
+    Вместо опроса GET /auctions/{id}/bids/: события приходят сами,
+    база читается максимум один раз при подключении.
+    """
+    snapshot = await price_hub.snapshot(db, auction_id)
+    # Соединение с базой больше не нужно — не держим его, пока открыт поток
+    await db.close()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Аукцион не найден")
+
+    async def event_stream():
+        async for event in _auction_events(auction_id, snapshot):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {event.type}\ndata: {event.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Без буферизации в nginx, иначе события придут пачкой
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{auction_id}/ws")
+async def auction_websocket(websocket: WebSocket, auction_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    То же, что /stream, но через WebSocket: JSON-сообщение на каждое событие
+    и {"type": "ping"} раз в stream_heartbeat секунд, пока событий нет.
+    """
+    snapshot = await price_hub.snapshot(db, auction_id)
+    await db.close()
+    if snapshot is None:
+        await websocket.close(code=4404, reason="Аукцион не найден")
+        return
+
+    await websocket.accept()
+
+    async def send_events():
+        async for event in _auction_events(auction_id, snapshot):
+            if event is None:
+                await websocket.send_text(WEBSOCKET_PING)
+            else:
+                await websocket.send_text(event.model_dump_json())
+
+    async def wait_disconnect():
+        # Клиент ничего не присылает: receive() вернётся, когда он отключится
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    # Отключение замечаем сразу, даже на аукционе без событий, —
+    # и сразу освобождаем очередь подписчика в price_hub
+    tasks = {asyncio.create_task(send_events()), asyncio.create_task(wait_disconnect())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
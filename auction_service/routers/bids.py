@@ -1,51 +1,138 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, and_, or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, insert, select, tuple_, update, and_, or_
 import models, schemas
 import aiohttp
+from config import settings
 from database import AsyncSession, get_db
+from utils.order_book import order_book
+from utils.price_stream import price_hub
 
 router = APIRouter()
 
 AUTH_SERVICE_URL = "http://127.0.0.1:8003/users/"  # Замените на URL вашего сервиса аутентификации
 
 
-@router.post("/auctions/{auction_id}/bids/", response_model=schemas.Bid)
-async def create_bid(auction_id: int, bid: schemas.BidCreate, db: AsyncSession = Depends(get_db)):
-    """Добавление ставки на аукцион."""
+async def publish_bid(auction_id: int, bid) -> None:
+    """Новая цена и ставка — подписчикам потока аукциона во всех воркерах."""
+    bid = schemas.Bid.model_validate(bid, from_attributes=True)
+    await price_hub.publish(schemas.AuctionEvent(
+        type="bid", auction_id=auction_id, current_price=bid.amount, bid=bid,
+    ))
 
-    # Проверяем, существует ли аукцион
-    auction = await db.get(models.Auction, auction_id)
-    if not auction:
-        raise HTTPException(status_code=404, detail="Аукцион не найден")
 
-    # Проверяем, активен ли аукцион
-    if not auction.is_active:
-        raise HTTPException(status_code=400, detail="Аукцион не активен")
+@router.post("/auctions/{auction_id}/bids/", response_model=schemas.Bid)
+async def create_bid(auction_id: int, bid: schemas.BidCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Добавление ставки на аукцион.
 
-    # Проверяем, что ставка больше текущей цены
-    if bid.amount <= auction.current_price:
-        raise HTTPException(status_code=400, detail="Ставка должна быть больше текущей цены")
+    Проверка "ставка больше текущей цены" и обновление цены — один условный
+    UPDATE: строка аукциона блокируется, и конкурирующая ставка после
+    коммита этой перепроверяет условие уже с новой ценой. Тот же UPDATE
+    увеличивает bid_count и берёт id ставки из bids_id_seq в top_bid_id —
+    под блокировкой, поэтому id принятых ставок растут вместе с суммой.
+    Запись ставки идёт в той же транзакции, поэтому ставка, цена и
+    счётчики не расходятся.
+    """
 
     # TODO: Добавив авторизацию, измените логику работы,
     #  чтобы user_external_id извлекалось не из запроса, а из данных токена авторизации(token_data)
 
-    db_bid = models.Bid(auction_id=auction_id, **bid.model_dump())
-    db.add(db_bid)
-    auction.current_price = bid.amount  # Обновляем текущую цену аукциона
+    if settings.order_book_enabled:
+        # Ставка принимается в памяти, в базу попадёт пачкой в фоне
+        db_bid = await order_book.place_bid(auction_id, bid)
+        await publish_bid(auction_id, db_bid)
+        return db_bid
+
+    result = await db.execute(
+        update(models.Auction)
+        .where(
+            models.Auction.id == auction_id,
+            models.Auction.is_active.is_(True),
+            # Ставки принимаются только между start_time и end_time (см. utils/scheduler.py)
+            models.Auction.status == "active",
+            models.Auction.current_price < bid.amount,
+        )
+        .values(
+            current_price=bid.amount,
+            bid_count=models.Auction.bid_count + 1,
+            top_bid_id=func.nextval("bids_id_seq"),
+        )
+        .returning(models.Auction.top_bid_id)
+    )
+    bid_id = result.scalar_one_or_none()
+    if bid_id is None:
+        await db.rollback()
+        # Ставка не прошла — выясняем почему, чтобы вернуть понятную ошибку
+        auction = await db.get(models.Auction, auction_id)
+        if not auction:
+            raise HTTPException(status_code=404, detail="Аукцион не найден")
+        if auction.status == "scheduled" and auction.is_active:
+            raise HTTPException(status_code=400, detail="Аукцион ещё не начался")
+        if not auction.is_active or auction.status != "active":
+            raise HTTPException(status_code=400, detail="Аукцион не активен")
+        raise HTTPException(status_code=400, detail="Ставка должна быть больше текущей цены")
+
+    result = await db.execute(
+        insert(models.Bid)
+        .values(id=bid_id, auction_id=auction_id, **bid.model_dump())
+        .returning(models.Bid)
+    )
+    db_bid = result.scalar_one()
     await db.commit()
-    await db.refresh(db_bid)
+    await publish_bid(auction_id, db_bid)
     return db_bid
 
 
+def _parse_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        amount, bid_id = cursor.split(":")
+        return float(amount), int(bid_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
 @router.get("/auctions/{auction_id}/bids/", response_model=list[schemas.Bid])
-async def get_bids(auction_id: int, db: AsyncSession = Depends(get_db)):
-    """Получение списка ставок для аукциона."""
+async def get_bids(
+        auction_id: int,
+        response: Response,
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str | None = Query(None),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    История ставок аукциона от старшей к младшей, постранично.
+
+    Ставки идут по (amount desc, id desc) — в порядке индекса
+    ix_bids_auction_id_amount (auction_id, amount desc, id desc): страница
+    читается одним проходом по индексу от курсора, без сортировки истории.
+    Курсор следующей страницы ("amount:id" последней ставки) приходит
+    в заголовке X-Next-Cursor.
+    """
     # Проверяем, существует ли аукцион
     auction = await db.get(models.Auction, auction_id)
     if not auction:
         raise HTTPException(status_code=404, detail="Аукцион не найден")
 
     query = select(models.Bid).where(models.Bid.auction_id == auction_id)
+    after = _parse_cursor(cursor) if cursor is not None else None
+    if after is not None:
+        query = query.where(tuple_(models.Bid.amount, models.Bid.id) < after)
+    # Берём на одну больше, чтобы узнать, есть ли следующая страница
+    query = query.order_by(models.Bid.amount.desc(), models.Bid.id.desc()).limit(limit + 1)
     results = await db.execute(query)
-    bids = results.scalars().all()
+    bids = list(results.scalars().all())
+
+    if settings.order_book_enabled:
+        # Принятые ставки, которые ещё не записаны в базу, — самые старшие
+        stored_ids = {bid.id for bid in bids}
+        pending = [
+            bid for bid in order_book.pending_bids(auction_id)
+            if bid.id not in stored_ids and (after is None or (bid.amount, bid.id) < after)
+        ]
+        if pending:
+            bids = sorted([*bids, *pending], key=lambda bid: (bid.amount, bid.id), reverse=True)
+
+    if len(bids) > limit:
+        bids = bids[:limit]
+        response.headers["X-Next-Cursor"] = f"{bids[-1].amount!r}:{bids[-1].id}"
     return bids
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 
 # Auctions - аукционы
@@ -24,6 +24,8 @@ class Auction(AuctionBase):
     is_active: bool
     start_time: datetime
     end_time: datetime
+    bid_count: int = 0
+    top_bid_id: int | None = None
 
 
 # Bids - ставки
@@ -39,3 +41,12 @@ class BidCreate(BidBase):
 class Bid(BidBase):
     id: int
     timestamp: datetime
+
+
+# События аукциона для потока цен (SSE/WebSocket)
+class AuctionEvent(BaseModel):
+    type: Literal["price", "bid", "status"]
+    auction_id: int
+    current_price: float
+    status: str | None = None
+    bid: Bid | None = None
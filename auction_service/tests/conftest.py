@@ -0,0 +1,66 @@
+import os
+
+import pytest
+import pytest_asyncio
+from dotenv import load_dotenv
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import get_db
+from main import app
+from models import Base
+
+
+@pytest.fixture(scope="session")
+def test_db_url():
+    """Собирает URL тестовой базы данных из .env.local."""
+    load_dotenv(".env.local")
+    db_user = os.getenv("TEST_DB_USER")
+    db_password = os.getenv("TEST_DB_PASSWORD")
+    db_host = os.getenv("TEST_DB_HOST")
+    db_port = os.getenv("TEST_DB_PORT")
+    db_name = os.getenv("TEST_DB_NAME")
+
+    if not all([db_user, db_password, db_host, db_port, db_name]):
+        raise ValueError(
+            "Не все необходимые переменные окружения для тестовой БД заданы в .env.local"
+        )
+
+    return f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+@pytest_asyncio.fixture
+async def session_factory(test_db_url):
+    # Пул побольше: стресс-тесты держат много соединений одновременно
+    engine = create_async_engine(test_db_url, pool_size=20, max_overflow=0)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def test_db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def client(session_factory):
+    # Своя сессия на каждый запрос, как в приложении: иначе параллельные
+    # запросы делили бы одно соединение и гонки не было бы видно
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+    app.dependency_overrides.pop(get_db, None)
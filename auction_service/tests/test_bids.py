@@ -0,0 +1,111 @@
+import asyncio
+import random
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from models import Auction, Bid
+
+
+@pytest_asyncio.fixture
+async def auction(test_db):
+    db_auction = Auction(lost_item_external_id="1", start_price=100, current_price=100, status="active")
+    test_db.add(db_auction)
+    await test_db.commit()
+    await test_db.refresh(db_auction)
+    return db_auction
+
+
+@pytest.mark.asyncio
+async def test_create_bid(client, auction):
+    response = await client.post(
+        f"/auctions/{auction.id}/bids/", json={"user_external_id": "u1", "amount": 150}
+    )
+    assert response.status_code == 200
+    assert response.json()["amount"] == 150
+
+    response = await client.post(
+        f"/auctions/{auction.id}/bids/", json={"user_external_id": "u2", "amount": 150}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bid_on_scheduled_auction_is_rejected(client, test_db):
+    db_auction = Auction(lost_item_external_id="1", start_price=100, current_price=100)
+    test_db.add(db_auction)
+    await test_db.commit()
+
+    response = await client.post(
+        f"/auctions/{db_auction.id}/bids/", json={"user_external_id": "u1", "amount": 150}
+    )
+
+    assert response.status_code == 400
+    await test_db.refresh(db_auction)
+    assert db_auction.bid_count == 0
+
+
+@pytest.mark.asyncio
+async def test_bid_on_unknown_auction(client):
+    response = await client.post("/auctions/999/bids/", json={"user_external_id": "u1", "amount": 150})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_parallel_bids_keep_max_price(client, test_db, auction):
+    """
+    Тысячи параллельных ставок: итоговая цена равна максимальной
+    принятой ставке, а принятые ставки строго возрастают по порядку записи.
+    """
+    amounts = [random.uniform(101, 10_000) for _ in range(2000)]
+
+    responses = await asyncio.gather(*(
+        client.post(
+            f"/auctions/{auction.id}/bids/",
+            json={"user_external_id": f"u{i}", "amount": amount},
+        )
+        for i, amount in enumerate(amounts)
+    ))
+
+    assert {response.status_code for response in responses} <= {200, 400}
+    accepted = [response.json()["amount"] for response in responses if response.status_code == 200]
+    assert accepted
+
+    await test_db.refresh(auction)
+    assert auction.current_price == max(accepted)
+    assert auction.bid_count == len(accepted)
+
+    result = await test_db.execute(
+        select(Bid.amount).where(Bid.auction_id == auction.id).order_by(Bid.id)
+    )
+    stored = result.scalars().all()
+    top_bid = await test_db.get(Bid, auction.top_bid_id)
+    assert top_bid.amount == max(accepted)
+    assert len(stored) == len(accepted)
+    assert stored == sorted(stored)
+    assert len(set(stored)) == len(stored)
+    count = await test_db.scalar(select(func.count()).select_from(Bid))
+    assert count == len(accepted)
+
+
+@pytest.mark.asyncio
+async def test_bid_history_is_paginated(client, auction):
+    for amount in range(110, 160, 10):
+        await client.post(f"/auctions/{auction.id}/bids/", json={"user_external_id": "u1", "amount": amount})
+
+    response = await client.get(f"/auctions/{auction.id}/bids/", params={"limit": 2})
+    assert [bid["amount"] for bid in response.json()] == [150, 140]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await client.get(f"/auctions/{auction.id}/bids/", params={"limit": 2, "cursor": cursor})
+    assert [bid["amount"] for bid in response.json()] == [130, 120]
+
+    response = await client.get(
+        f"/auctions/{auction.id}/bids/", params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]}
+    )
+    assert [bid["amount"] for bid in response.json()] == [110]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = await client.get(f"/auctions/{auction.id}/bids/", params={"cursor": "oops"})
+    assert response.status_code == 400
@@ -0,0 +1,104 @@
+import asyncio
+import random
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import select
+
+import schemas
+from models import Auction, Bid
+from utils.order_book import OrderBook
+
+
+@pytest_asyncio.fixture
+async def auction(test_db):
+    db_auction = Auction(lost_item_external_id="1", start_price=100, current_price=100, status="active")
+    test_db.add(db_auction)
+    await test_db.commit()
+    await test_db.refresh(db_auction)
+    return db_auction
+
+
+@pytest.mark.asyncio
+async def test_order_book_flushes_accepted_bids(session_factory, test_db, auction):
+    book = OrderBook(session_factory)
+    await book.start()
+
+    async def place(i, amount):
+        try:
+            return await book.place_bid(auction.id, schemas.BidCreate(user_external_id=f"u{i}", amount=amount))
+        except HTTPException:
+            return None
+
+    results = await asyncio.gather(*(place(i, random.uniform(101, 10_000)) for i in range(1000)))
+    accepted = [bid for bid in results if bid is not None]
+    await book.stop()
+
+    result = await test_db.execute(select(Bid).where(Bid.auction_id == auction.id).order_by(Bid.id))
+    stored = result.scalars().all()
+    assert [bid.id for bid in stored] == sorted(bid.id for bid in accepted)
+    amounts = [bid.amount for bid in stored]
+    assert amounts == sorted(amounts)
+    await test_db.refresh(auction)
+    assert auction.current_price == max(amounts)
+    assert auction.bid_count == len(accepted)
+    assert auction.top_bid_id == stored[-1].id
+
+
+@pytest.mark.asyncio
+async def test_order_book_recovers_state(session_factory, auction):
+    book = OrderBook(session_factory)
+    await book.start()
+    await book.place_bid(auction.id, schemas.BidCreate(user_external_id="u1", amount=500))
+    await book.stop()
+
+    restarted = OrderBook(session_factory)
+    await restarted.start()
+    try:
+        assert [bid.amount for bid in restarted.recent_bids(auction.id)] == [500]
+        with pytest.raises(HTTPException):
+            await restarted.place_bid(auction.id, schemas.BidCreate(user_external_id="u2", amount=400))
+    finally:
+        await restarted.stop()
+
+
+@pytest.mark.asyncio
+async def test_order_book_rejects_bids_before_start(session_factory, test_db):
+    scheduled = Auction(lost_item_external_id="1", start_price=100, current_price=100)
+    test_db.add(scheduled)
+    await test_db.commit()
+
+    book = OrderBook(session_factory)
+    await book.start()
+    try:
+        with pytest.raises(HTTPException):
+            await book.place_bid(scheduled.id, schemas.BidCreate(user_external_id="u1", amount=150))
+        book.set_active(scheduled.id, True)  # как при открытии планировщиком
+        await book.place_bid(scheduled.id, schemas.BidCreate(user_external_id="u1", amount=150))
+    finally:
+        await book.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_drops_bids_of_deleted_auction(session_factory, test_db, auction):
+    doomed = Auction(lost_item_external_id="2", start_price=100, current_price=100, status="active")
+    test_db.add(doomed)
+    await test_db.commit()
+
+    book = OrderBook(session_factory)
+    await book.start()
+    try:
+        await book.place_bid(doomed.id, schemas.BidCreate(user_external_id="u1", amount=150))
+        await book.place_bid(auction.id, schemas.BidCreate(user_external_id="u2", amount=150))
+        await test_db.delete(doomed)
+        await test_db.commit()
+
+        assert await book.flush() == 1
+        assert book.pending_bids(doomed.id) == []
+        assert book.pending_bids(auction.id) == []
+    finally:
+        await book.stop()
+
+    stored = (await test_db.execute(select(Bid.user_external_id))).scalars().all()
+    assert stored == ["u2"]
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import schemas
+from models import Auction
+from config import settings
+from main import app
+from utils.price_stream import PriceHub, price_hub
+
+
+def bid_event(auction_id, price):
+    return schemas.AuctionEvent(type="bid", auction_id=auction_id, current_price=price)
+
+
+@pytest.mark.asyncio
+async def test_dispatch_reaches_only_auction_subscribers():
+    hub = PriceHub()
+    async with hub.subscribe(1) as first, hub.subscribe(1) as second, hub.subscribe(2) as other:
+        hub.dispatch(bid_event(1, 150))
+
+        assert (await first.get()).current_price == 150
+        assert (await second.get()).current_price == 150
+        assert other.empty()
+    assert hub.subscribers_count(1) == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_oldest_events():
+    hub = PriceHub()
+    async with hub.subscribe(1) as queue:
+        for price in range(queue.maxsize + 5):
+            hub.dispatch(bid_event(1, price))
+
+        assert queue.qsize() == queue.maxsize
+        assert (await asyncio.wait_for(queue.get(), 1)).current_price == 5
+
+
+@pytest.mark.asyncio
+async def test_snapshot_uses_latest_event_without_db():
+    hub = PriceHub()
+    async with hub.subscribe(1):
+        hub.dispatch(bid_event(1, 300))
+        hub.dispatch(bid_event(1, 200))  # запоздавшее событие из другого воркера
+
+        snapshot = await hub.snapshot(db=None, auction_id=1)
+
+    assert snapshot.type == "price"
+    assert snapshot.current_price == 300
+
+
+class FakeDb:
+    def __init__(self, price):
+        self.price = price
+        self.reads = 0
+
+    async def get(self, model, auction_id):
+        self.reads += 1
+        return Auction(id=auction_id, current_price=self.price, status="active")
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_reread(monkeypatch):
+    monkeypatch.setattr(settings, "stream_snapshot_ttl", 0.05)
+    hub = PriceHub()
+    async with hub.subscribe(1):
+        hub.dispatch(bid_event(1, 300))
+        db = FakeDb(price=400)  # событие о цене 400 до этого воркера не дошло
+
+        assert (await hub.snapshot(db, 1)).current_price == 300
+        await asyncio.sleep(0.06)
+        assert (await hub.snapshot(db, 1)).current_price == 400
+        assert db.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_snapshot_dropped_without_subscribers():
+    hub = PriceHub()
+    async with hub.subscribe(1):
+        hub.dispatch(bid_event(1, 300))
+    hub.dispatch(schemas.AuctionEvent(type="status", auction_id=2, current_price=100, status="closed"))
+
+    assert hub._latest == {}
+
+
+def test_websocket_heartbeat_and_unsubscribe_on_disconnect(monkeypatch):
+    monkeypatch.setattr(settings, "stream_heartbeat", 0.05)
+    # Свежий снимок — без обращения к базе
+    monkeypatch.setitem(price_hub._latest, 777, (time.monotonic(), bid_event(777, 500)))
+
+    with TestClient(app).websocket_connect("/auctions/777/ws") as websocket:
+        assert websocket.receive_json()["current_price"] == 500
+        assert websocket.receive_json() == {"type": "ping"}
+        assert price_hub.subscribers_count(777) == 1
+
+    for _ in range(50):
+        if price_hub.subscribers_count(777) == 0:
+            break
+        time.sleep(0.01)
+    assert price_hub.subscribers_count(777) == 0
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from models import Auction, Bid
+from utils.scheduler import AuctionScheduler
+
+
+def test_plan_keeps_only_latest_action():
+    scheduler = AuctionScheduler()
+    start, end = datetime(2026, 1, 1, 12), datetime(2026, 1, 1, 16)
+
+    scheduler.plan(1, "scheduled", start, end)
+    scheduler.plan(1, "scheduled", start, end)  # повтор не дублирует запись
+    assert len(scheduler._heap) == 1
+    scheduler.plan(1, "active", start, end)
+    assert scheduler._planned[1] == (end, "close")
+    scheduler.plan(1, "closed", start, end)
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_uses_top_bid_id(session_factory, test_db, expired_auction):
+    low_bid = await test_db.scalar(select(Bid).where(Bid.amount == 200))
+    expired_auction.top_bid_id = low_bid.id
+    expired_auction.bid_count = 2
+    await test_db.commit()
+
+    scheduler = AuctionScheduler(session_factory)
+    await scheduler.reload()
+    await scheduler.run_due()
+
+    await test_db.refresh(expired_auction)
+    assert expired_auction.winner_external_id == "u1"
+
+
+def test_next_wakeup_is_capped_by_refresh_interval():
+    scheduler = AuctionScheduler()
+    scheduler._clock_offset = timedelta(0)
+    scheduler.plan(1, "active", datetime.now(), datetime.now() + timedelta(days=30))
+    assert 0 < scheduler._seconds_until_next() <= 300
+    scheduler.plan(2, "active", datetime.now(), datetime.now() - timedelta(seconds=1))
+    assert scheduler._seconds_until_next() == 0
+
+
+@pytest_asyncio.fixture
+async def expired_auction(test_db):
+    db_auction = Auction(
+        lost_item_external_id="1", start_price=100, current_price=300, status="active",
+        end_time=datetime.now() - timedelta(hours=1),
+    )
+    test_db.add(db_auction)
+    await test_db.commit()
+    test_db.add_all([
+        Bid(auction_id=db_auction.id, user_external_id="u1", amount=200),
+        Bid(auction_id=db_auction.id, user_external_id="u2", amount=300),
+    ])
+    await test_db.commit()
+    return db_auction
+
+
+@pytest.mark.asyncio
+async def test_scheduler_closes_expired_auction(session_factory, test_db, expired_auction):
+    scheduler = AuctionScheduler(session_factory)
+    await scheduler.reload()
+    await scheduler.run_due()
+
+    await test_db.refresh(expired_auction)
+    assert expired_auction.status == "closed"
+    assert expired_auction.is_active is False
+    assert expired_auction.winner_external_id == "u2"
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_falls_back_to_top_bid_query(session_factory, test_db, expired_auction):
+    # Ставка той же суммы, сделанная позже, не побеждает
+    test_db.add(Bid(auction_id=expired_auction.id, user_external_id="u3", amount=300))
+    await test_db.commit()
+    assert expired_auction.top_bid_id is None
+
+    scheduler = AuctionScheduler(session_factory)
+    await scheduler.reload()
+    await scheduler.run_due()
+
+    await test_db.refresh(expired_auction)
+    assert expired_auction.winner_external_id == "u2"
@@ -0,0 +1,324 @@
+"""
+Книга заявок в памяти процесса для "горячих" аукционов.
+
+Ставка проверяется и принимается под asyncio-блокировкой своего аукциона
+без обращения к базе, а в таблицу bids попадает позже — пачкой
+(write-behind). id ставок заранее выделяются блоками из последовательности
+bids_id_seq, поэтому клиент сразу получает настоящий id.
+
+Ограничения:
+- принятые, но ещё не сброшенные ставки теряются при падении процесса
+  (окно — order_book_flush_interval);
+- решение о ставке принимает один процесс, поэтому движок включают
+  только при одном воркере (или при маршрутизации аукциона на один воркер).
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+from config import settings
+from database import AsyncSessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+
+def accepts_bids(auction: models.Auction) -> bool:
+    """Ставки принимаются, только пока аукцион открыт планировщиком (status="active")."""
+    return auction.is_active and auction.status == "active"
+
+
+class AuctionBook:
+    """Состояние одного аукциона: текущая цена и последние ставки."""
+
+    def __init__(self, current_price: float, is_active: bool):
+        self.lock = asyncio.Lock()
+        self.current_price = current_price
+        self.is_active = is_active  # принимает ли ставки (см. accepts_bids)
+        self.recent: deque[schemas.Bid] = deque(maxlen=settings.order_book_recent_bids)
+
+
+class BidIdAllocator:
+    """Выдаёт id ставок из блоков, заранее взятых из bids_id_seq."""
+
+    def __init__(self, session_factory, block_size: int):
+        self._session_factory = session_factory
+        self._block_size = block_size
+        self._ids: deque[int] = deque()
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> int:
+        async with self._lock:
+            if not self._ids:
+                async with self._session_factory() as db:
+                    result = await db.execute(
+                        select(func.nextval("bids_id_seq")).select_from(
+                            func.generate_series(1, self._block_size)
+                        )
+                    )
+                    self._ids.extend(result.scalars().all())
+            return self._ids.popleft()
+
+
+class OrderBook:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._books: dict[int, AuctionBook] = {}
+        self._books_lock = asyncio.Lock()
+        self._ids = BidIdAllocator(session_factory, settings.order_book_id_block)
+        # Принятые ставки, ещё не записанные в базу: (auction_id, bid)
+        self._pending: list[tuple[int, schemas.Bid]] = []
+        # Пачка, которая записывается прямо сейчас
+        self._flushing: list[tuple[int, schemas.Bid]] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._stopping = False
+
+    async def _get_book(self, auction_id: int) -> AuctionBook | None:
+        book = self._books.get(auction_id)
+        if book is not None:
+            return book
+        async with self._books_lock:
+            book = self._books.get(auction_id)
+            if book is None:
+                async with self._session_factory() as db:
+                    auction = await db.get(models.Auction, auction_id)
+                if auction is None:
+                    return None
+                book = self._books[auction_id] = AuctionBook(auction.current_price, accepts_bids(auction))
+        return book
+
+    async def place_bid(self, auction_id: int, bid: schemas.BidCreate) -> schemas.Bid:
+        """
+        Принимает ставку, если она больше текущей цены. Проверка и обновление
+        цены идут под блокировкой аукциона, запись в базу — в фоне.
+        """
+        book = await self._get_book(auction_id)
+        if book is None:
+            raise HTTPException(status_code=404, detail="Аукцион не найден")
+
+        async with book.lock:
+            if not book.is_active:
+                raise HTTPException(status_code=400, detail="Аукцион не активен")
+            if bid.amount <= book.current_price:
+                raise HTTPException(status_code=400, detail="Ставка должна быть больше текущей цены")
+
+            accepted = schemas.Bid(
+                id=await self._ids.next_id(),
+                timestamp=datetime.now(timezone.utc).replace(tzinfo=None),
+                **bid.model_dump(),
+            )
+            book.current_price = bid.amount
+            book.recent.append(accepted)
+            self._pending.append((auction_id, accepted))
+
+        if len(self._pending) >= settings.order_book_batch_size:
+            self._wakeup.set()
+        return accepted
+
+    def pending_bids(self, auction_id: int) -> list[schemas.Bid]:
+        """
+        Принятые ставки аукциона, которые ещё не попали в базу
+        (или записываются прямо сейчас — возможен повтор строки из базы).
+        """
+        return [
+            bid for pending_auction_id, bid in (*self._flushing, *self._pending)
+            if pending_auction_id == auction_id
+        ]
+
+    def recent_bids(self, auction_id: int) -> list[schemas.Bid]:
+        book = self._books.get(auction_id)
+        return list(book.recent) if book else []
+
+    def set_active(self, auction_id: int, is_active: bool) -> None:
+        """Аукцион открыт/закрыт вне книги (например, по расписанию)."""
+        book = self._books.get(auction_id)
+        if book is not None:
+            book.is_active = is_active
+
+    async def close(self, auction_id: int) -> None:
+        """
+        Закрывает аукцион в книге и дожидается записи всех его принятых ставок:
+        после этого победителя можно выбирать по таблице bids.
+        """
+        book = self._books.get(auction_id)
+        if book is not None:
+            async with book.lock:
+                book.is_active = False
+        await self.flush()
+
+    async def _write(self, batch: list[tuple[int, schemas.Bid]]) -> None:
+        """Одна транзакция: multi-row INSERT ставок и UPDATE их аукционов."""
+        # По каждому аукциону пачки: число ставок и старшая ставка
+        stats: dict[int, dict] = {}
+        for auction_id, bid in batch:
+            item = stats.setdefault(auction_id, {
+                "auction_id": auction_id, "count": 0, "price": bid.amount, "top_bid_id": bid.id,
+            })
+            item["count"] += 1
+            if bid.amount > item["price"]:
+                item["price"], item["top_bid_id"] = bid.amount, bid.id
+
+        async with self._session_factory() as db:
+            await db.execute(
+                insert(models.Bid),
+                [{"auction_id": auction_id, **bid.model_dump()} for auction_id, bid in batch],
+            )
+            auctions = models.Auction.__table__
+            outbid = auctions.c.current_price < bindparam("price")
+            await db.execute(
+                update(auctions)
+                .where(auctions.c.id == bindparam("auction_id"))
+                .values(
+                    bid_count=auctions.c.bid_count + bindparam("count"),
+                    current_price=case((outbid, bindparam("price")), else_=auctions.c.current_price),
+                    top_bid_id=case((outbid, bindparam("top_bid_id")), else_=auctions.c.top_bid_id),
+                ),
+                list(stats.values()),
+            )
+            await db.commit()
+
+    async def _write_by_auction(self, batch: list[tuple[int, schemas.Bid]]) -> int:
+        """
+        Запись пачки по аукционам, когда общая транзакция нарушила ограничение:
+        ставки аукциона, которые не записать никогда (например, аукцион удалён),
+        выбрасываются в лог, остальные аукционы записываются или ждут повтора.
+        """
+        groups: dict[int, list[tuple[int, schemas.Bid]]] = {}
+        for auction_id, bid in batch:
+            groups.setdefault(auction_id, []).append((auction_id, bid))
+
+        written, retry = 0, []
+        for auction_id, group in groups.items():
+            try:
+                await self._write(group)
+                written += len(group)
+            except IntegrityError:
+                logger.error(
+                    "Dropping %s bids of auction %s that cannot be stored: %s",
+                    len(group), auction_id, [bid.model_dump(mode="json") for _, bid in group],
+                    exc_info=True,
+                )
+                # Книгу читаем заново из базы: следующая ставка получит 404/400
+                self._books.pop(auction_id, None)
+            except Exception:
+                logger.exception("Failed to flush %s bids of auction %s, will retry", len(group), auction_id)
+                retry.extend(group)
+        self._pending[:0] = retry
+        return written
+
+    async def flush(self) -> int:
+        """
+        Записывает накопленные ставки одной транзакцией: multi-row INSERT
+        в bids и UPDATE цен, bid_count и top_bid_id аукционов (цена в базе
+        только растёт).
+        При временной ошибке ставки возвращаются в очередь и запишутся
+        в следующий раз; при нарушении ограничения пачка пишется по
+        аукционам, чтобы одна плохая строка не блокировала остальные.
+        """
+        # Одна запись за раз: close() должен дождаться и пачки, которую пишет фон
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            self._flushing = batch
+
+            try:
+                await self._write(batch)
+            except IntegrityError:
+                return await self._write_by_auction(batch)
+            except Exception:
+                logger.exception("Failed to flush %s bids, will retry", len(batch))
+                self._pending[:0] = batch
+                return 0
+            finally:
+                self._flushing = []
+            return len(batch)
+
+    async def _flush_loop(self) -> None:
+        # Задачу не отменяем, а останавливаем флагом: отмена посреди
+        # записи потеряла бы уже вынутую из очереди пачку
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.order_book_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def recover(self) -> None:
+        """
+        Восстановление после перезапуска: книга строится заново из базы.
+        Цена активного аукциона — максимум из current_price и ставок
+        (если процесс упал посреди записи, цена в базе подтягивается к ставкам).
+        """
+        async with self._session_factory() as db:
+            await self._repair_prices(db)
+            result = await db.execute(select(models.Auction).where(models.Auction.is_active.is_(True)))
+            self._books = {
+                auction.id: AuctionBook(auction.current_price, accepts_bids(auction))
+                for auction in result.scalars().all()
+            }
+            if not self._books:
+                return
+
+            ranked = (
+                select(
+                    models.Bid,
+                    func.row_number().over(
+                        partition_by=models.Bid.auction_id, order_by=models.Bid.id.desc()
+                    ).label("position"),
+                )
+                .where(models.Bid.auction_id.in_(self._books))
+                .subquery()
+            )
+            result = await db.execute(
+                select(ranked)
+                .where(ranked.c.position <= settings.order_book_recent_bids)
+                .order_by(ranked.c.auction_id, ranked.c.id)
+            )
+            for row in result.mappings().all():
+                self._books[row["auction_id"]].recent.append(schemas.Bid.model_validate(dict(row)))
+
+    async def _repair_prices(self, db: AsyncSession) -> None:
+        top_bids = (
+            select(models.Bid.auction_id, func.max(models.Bid.amount).label("amount"))
+            .group_by(models.Bid.auction_id)
+            .subquery()
+        )
+        await db.execute(
+            update(models.Auction)
+            .where(
+                models.Auction.id == top_bids.c.auction_id,
+                models.Auction.current_price < top_bids.c.amount,
+            )
+            .values(current_price=top_bids.c.amount)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async def start(self) -> None:
+        await self.recover()
+        self._stopping = False
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую запись и сбрасывает оставшиеся ставки."""
+        if self._flusher is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+
+
+order_book = OrderBook()
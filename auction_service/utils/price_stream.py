@@ -0,0 +1,94 @@
+"""
+Раздача событий аукциона подписчикам SSE/WebSocket внутри процесса.
+
+Событие приходит в воркер один раз (из его очереди RabbitMQ) и
+раскладывается по очередям всех подписчиков этого аукциона в памяти,
+поэтому число зрителей не влияет на нагрузку на базу и брокер.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+from broker import publish_auction_event
+from config import settings
+
+
+class PriceHub:
+    def __init__(self):
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        # Последнее событие аукциона и когда оно получено — снимок для новых
+        # подписчиков. Хранится только для аукционов с подписчиками этого
+        # воркера и не дольше stream_snapshot_ttl (событие из другого воркера
+        # могло потеряться, если брокер был недоступен)
+        self._latest: dict[int, tuple[float, schemas.AuctionEvent]] = {}
+
+    def subscribers_count(self, auction_id: int) -> int:
+        return len(self._subscribers.get(auction_id, ()))
+
+    @asynccontextmanager
+    async def subscribe(self, auction_id: int):
+        """Очередь событий аукциона; отписка — при выходе из контекста."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.stream_queue_size)
+        self._subscribers.setdefault(auction_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(auction_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[auction_id]
+                    self._latest.pop(auction_id, None)
+
+    def dispatch(self, event: schemas.AuctionEvent) -> None:
+        """
+        Раздаёт событие подписчикам аукциона. Медленный клиент не тормозит
+        остальных: при переполненной очереди теряет самое старое событие.
+        """
+        queues = self._subscribers.get(event.auction_id)
+        if not queues:
+            # Смотреть некому — снимок не нужен (в том числе закрытого аукциона)
+            self._latest.pop(event.auction_id, None)
+            return
+        latest = self._latest.get(event.auction_id)
+        if latest is None or event.type != "bid" or event.current_price >= latest[1].current_price:
+            self._latest[event.auction_id] = (time.monotonic(), event)
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def snapshot(self, db: AsyncSession, auction_id: int) -> schemas.AuctionEvent | None:
+        """
+        Текущее состояние аукциона для нового подписчика.
+        База читается, если свежего (моложе stream_snapshot_ttl) события
+        аукциона в процессе нет.
+        """
+        latest = self._latest.get(auction_id)
+        if latest is not None and time.monotonic() - latest[0] < settings.stream_snapshot_ttl:
+            event = latest[1]
+        else:
+            auction = await db.get(models.Auction, auction_id)
+            if auction is None:
+                return None
+            event = schemas.AuctionEvent(
+                type="price", auction_id=auction_id,
+                current_price=auction.current_price, status=auction.status,
+            )
+            self._latest[auction_id] = (time.monotonic(), event)
+        return event.model_copy(update={"type": "price", "bid": None})
+
+    async def publish(self, event: schemas.AuctionEvent) -> None:
+        """
+        Отправляет событие всем воркерам через RabbitMQ (этот воркер получит
+        его из своей очереди). Если брокер недоступен — хотя бы своим подписчикам.
+        """
+        if not await publish_auction_event(event):
+            self.dispatch(event)
+
+
+price_hub = PriceHub()
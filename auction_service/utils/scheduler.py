@@ -0,0 +1,237 @@
+"""
+Планировщик жизненного цикла аукционов: scheduled -> active -> closed.
+
+Для каждого незакрытого аукциона в памяти хранится ближайшее действие
+(открыть в start_time или закрыть в end_time) в куче по времени. Цикл
+спит ровно до ближайшего срока, поэтому таблица не опрашивается каждую
+секунду: она целиком перечитывается раз в scheduler_refresh_interval,
+а новые аукционы добавляются по уведомлению (notify).
+
+Работает один воркер: тот, кто взял advisory lock в Postgres, остальные
+ждут в резерве. Переходы — условные UPDATE, так что повторное
+выполнение (например, при смене лидера) ничего не ломает.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+from config import settings
+from database import AsyncSessionLocal, engine
+from utils.order_book import order_book
+from utils.price_stream import price_hub
+
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_lock, которым выбирается единственный планировщик
+SCHEDULER_LOCK_KEY = 0x61756374  # "auct"
+
+OPEN_STATUSES = ("scheduled", "active")
+
+
+class AuctionScheduler:
+    def __init__(self, session_factory=AsyncSessionLocal, db_engine=engine):
+        self._session_factory = session_factory
+        self._engine = db_engine
+        # Куча (когда, id аукциона, действие); устаревшие записи пропускаются
+        self._heap: list[tuple[datetime, int, str]] = []
+        # Актуальное действие для каждого аукциона: id -> (когда, действие)
+        self._planned: dict[int, tuple[datetime, str]] = {}
+        self._dirty: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._clock_offset = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._planned)
+
+    def now(self) -> datetime:
+        """Текущее время по часам базы (времена аукционов — её now())."""
+        return datetime.now() + self._clock_offset
+
+    def plan(self, auction_id: int, status: str, start_time: datetime, end_time: datetime) -> None:
+        """Ставит ближайшее действие аукциона в кучу (или снимает, если он закрыт)."""
+        if status == "scheduled":
+            entry = (start_time, "start")
+        elif status == "active":
+            entry = (end_time, "close")
+        else:
+            self._planned.pop(auction_id, None)
+            return
+        if self._planned.get(auction_id) != entry:
+            self._planned[auction_id] = entry
+            heapq.heappush(self._heap, (entry[0], auction_id, entry[1]))
+
+    def notify(self, auction_id: int) -> None:
+        """Аукцион создан/изменён — перечитать его при следующем проходе."""
+        self._dirty.add(auction_id)
+        self._wakeup.set()
+
+    async def _load(self, db: AsyncSession, auction_ids=None) -> None:
+        query = select(
+            models.Auction.id, models.Auction.status,
+            models.Auction.start_time, models.Auction.end_time,
+        ).where(models.Auction.status.in_(OPEN_STATUSES))
+        if auction_ids is not None:
+            query = query.where(models.Auction.id.in_(auction_ids))
+        else:
+            self._heap, self._planned = [], {}
+        result = await db.execute(query)
+        for row in result.all():
+            self.plan(row.id, row.status, row.start_time, row.end_time)
+
+    async def reload(self) -> None:
+        """Полная перезагрузка кучи из таблицы и сверка часов с базой."""
+        async with self._session_factory() as db:
+            # localtimestamp — naive время сессии, как у server_default now()
+            # в start_time/end_time (now() вернул бы timestamptz в UTC)
+            db_now = await db.scalar(select(func.localtimestamp()))
+            self._clock_offset = db_now - datetime.now()
+            await self._load(db)
+        self._dirty.clear()
+
+    async def _start_auction(self, db: AsyncSession, auction_id: int) -> None:
+        result = await db.execute(
+            update(models.Auction)
+            .where(models.Auction.id == auction_id, models.Auction.status == "scheduled")
+            .values(status="active", is_active=True)
+            .returning(models.Auction)
+        )
+        auction = result.scalar_one_or_none()
+        await db.commit()
+        if auction is not None:
+            order_book.set_active(auction.id, True)
+            self.plan(auction.id, auction.status, auction.start_time, auction.end_time)
+            await self._publish_status(auction)
+
+    async def _close_auction(self, db: AsyncSession, auction_id: int) -> None:
+        if settings.order_book_enabled:
+            # Ставки, принятые в памяти, должны попасть в базу до выбора победителя
+            await order_book.close(auction_id)
+            if order_book.pending_bids(auction_id):
+                raise RuntimeError(f"Bids of auction {auction_id} are not flushed yet")
+
+        # Блокируем строку аукциона: ставка, успевшая обновить цену, закоммитится
+        # раньше, а новые будут ждать и затем не пройдут по is_active
+        auction = await db.scalar(
+            select(models.Auction).where(models.Auction.id == auction_id).with_for_update()
+        )
+        if auction is None or auction.status not in OPEN_STATUSES:
+            await db.rollback()
+            self._planned.pop(auction_id, None)
+            return
+
+        # Старшая ставка поддерживается в самом аукционе (top_bid_id); для ставок,
+        # записанных в обход create_bid/книги заявок, ищем её по индексу
+        if auction.top_bid_id is not None:
+            top_bid = await db.get(models.Bid, auction.top_bid_id)
+        else:
+            top_bid = await db.scalar(
+                select(models.Bid)
+                .where(models.Bid.auction_id == auction_id)
+                .order_by(models.Bid.amount.desc(), models.Bid.id)
+                .limit(1)
+            )
+        auction.status = "closed"
+        auction.is_active = False
+        auction.winner_external_id = top_bid.user_external_id if top_bid else ""
+        await db.commit()
+
+        self._planned.pop(auction_id, None)
+        await self._publish_status(auction)
+        logger.info("Auction %s closed, winner %r", auction_id, auction.winner_external_id)
+
+    async def _publish_status(self, auction: models.Auction) -> None:
+        await price_hub.publish(schemas.AuctionEvent(
+            type="status", auction_id=auction.id,
+            current_price=auction.current_price, status=auction.status,
+        ))
+
+    async def run_due(self) -> None:
+        """Выполняет все действия, срок которых наступил."""
+        now = self.now()
+        while self._heap and self._heap[0][0] <= now:
+            when, auction_id, action = heapq.heappop(self._heap)
+            if self._planned.get(auction_id) != (when, action):
+                continue  # запись устарела
+            try:
+                async with self._session_factory() as db:
+                    if action == "start":
+                        await self._start_auction(db, auction_id)
+                    else:
+                        await self._close_auction(db, auction_id)
+            except Exception:
+                logger.exception("Failed to %s auction %s", action, auction_id)
+                # Повторим чуть позже, чтобы не зациклиться на ошибке
+                retry_at = now + timedelta(seconds=settings.scheduler_retry_delay)
+                self._planned[auction_id] = (retry_at, action)
+                heapq.heappush(self._heap, (retry_at, auction_id, action))
+
+    def _seconds_until_next(self) -> float:
+        if not self._heap:
+            return settings.scheduler_refresh_interval
+        delay = (self._heap[0][0] - self.now()).total_seconds()
+        return max(0.0, min(delay, settings.scheduler_refresh_interval))
+
+    async def _run_as_leader(self) -> None:
+        await self.reload()
+        last_reload = asyncio.get_running_loop().time()
+        logger.info("Auction scheduler started with %s open auctions", len(self))
+
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._seconds_until_next())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if asyncio.get_running_loop().time() - last_reload >= settings.scheduler_refresh_interval:
+                await self.reload()
+                last_reload = asyncio.get_running_loop().time()
+            elif self._dirty:
+                dirty, self._dirty = self._dirty, set()
+                async with self._session_factory() as db:
+                    await self._load(db, dirty)
+            await self.run_due()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                async with self._engine.connect() as conn:
+                    # Session-level lock живёт, пока открыто соединение
+                    leader = await conn.scalar(select(func.pg_try_advisory_lock(SCHEDULER_LOCK_KEY)))
+                    await conn.commit()
+                    if leader:
+                        await self._run_as_leader()
+                        continue
+            except Exception:
+                logger.exception("Auction scheduler failed, restarting")
+            # Другой воркер уже планирует — ждём в резерве
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.scheduler_standby_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Уведомления адресованы ведущему; став им, мы всё равно перечитаем таблицу
+            self._dirty.clear()
+
+    def start(self) -> None:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+
+auction_scheduler = AuctionScheduler()
@@ -0,0 +1,48 @@
+"""add search_vector columns and trigram indexes
+
+Revision ID: 22559039e5b2
+Revises: 46d61526fa2f
+Create Date: 2026-10-18 13:47:16.224580
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '22559039e5b2'
+down_revision: Union[str, None] = '46d61526fa2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_SQL = "to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table in ('lost_items', 'found_items'):
+        # Генерируемая колонка: Postgres пересчитывает её при каждом INSERT/UPDATE
+        op.add_column(table, sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_SQL, persisted=True),
+            nullable=False,
+        ))
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False, postgresql_using='gin')
+        op.create_index(
+            f'ix_{table}_location_trgm', table, ['location'], unique=False,
+            postgresql_using='gin', postgresql_ops={'location': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('found_items', 'lost_items'):
+        op.drop_index(f'ix_{table}_location_trgm', table_name=table)
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
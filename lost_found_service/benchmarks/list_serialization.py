@@ -0,0 +1,82 @@
+"""
+Сравнение сериализации страницы списка предметов (1000 строк):
+
+- response_model: ORM-объекты -> валидация в schemas.LostItem ->
+  dump_python(mode="json") -> json.dumps (так отвечает FastAPI сейчас);
+- TypeAdapter.dump_json: словари строк -> один вызов pydantic-core;
+- orjson: словари строк (как из Result.mappings()) -> orjson.dumps
+  (быстрый путь fields=/include=tags).
+
+База не нужна. Запуск (из lost_found_service):
+
+    python -m benchmarks.list_serialization
+"""
+import json
+import timeit
+from datetime import datetime, timedelta
+
+import orjson
+from pydantic import TypeAdapter
+
+import models
+import schemas
+
+
+ROWS = 1000
+REPEAT = 20
+
+
+def make_orm_items(count: int) -> list[models.LostItem]:
+    tags = [models.Tag(id=i, name=f"тег {i}") for i in range(1, 6)]
+    start = datetime(2025, 3, 12, 10, 0)
+    return [
+        models.LostItem(
+            id=i, name=f"Паспорт {i}", description="Коричневая обложка, внутри билет " * 5,
+            lost_date=start + timedelta(minutes=i), location="Станция метро", category_id=1,
+            tags=tags[: i % 6],
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def as_mappings(items: list[models.LostItem]) -> list[dict]:
+    return [
+        {
+            "id": item.id, "name": item.name, "description": item.description,
+            "lost_date": item.lost_date, "location": item.location,
+            "category_id": item.category_id,
+            "tags": [{"id": tag.id, "name": tag.name} for tag in item.tags],
+        }
+        for item in items
+    ]
+
+
+def main() -> None:
+    items = make_orm_items(ROWS)
+    rows = as_mappings(items)
+    adapter = TypeAdapter(list[schemas.LostItem])
+
+    def response_model_path():
+        value = adapter.validate_python(items, from_attributes=True)
+        content = adapter.dump_python(value, mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def type_adapter_path():
+        return adapter.dump_json(adapter.validate_python(rows))
+
+    def orjson_path():
+        return orjson.dumps(rows)
+
+    assert json.loads(response_model_path()) == json.loads(orjson_path())
+
+    for name, func in (
+        ("response_model", response_model_path),
+        ("TypeAdapter.dump_json", type_adapter_path),
+        ("orjson", orjson_path),
+    ):
+        best = min(timeit.repeat(func, number=1, repeat=REPEAT))
+        print(f"{name:<22} {best * 1000:8.2f} ms / {ROWS} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import logging
+import uuid
+
+from faststream.rabbit import ExchangeType, RabbitExchange, RabbitQueue
+from faststream.rabbit.fastapi import RabbitRouter
+
+from config import settings
+
+
+router = RabbitRouter(settings.rabbitmq_url)
+
+# Очередь событий "предмет создан/изменён" для фонового поиска совпадений
+ITEMS_CHANGED_QUEUE = "lost_found.items.changed"
+
+# Сброс кэша категорий/тегов: fanout доставляет сообщение каждому воркеру,
+# у каждого процесса своя эксклюзивная очередь, удаляемая при отключении
+CACHE_EXCHANGE = RabbitExchange("lost_found.cache.invalidate", type=ExchangeType.FANOUT)
+cache_invalidation_queue = RabbitQueue(
+    f"lost_found.cache.invalidate.{uuid.uuid4().hex}", exclusive=True, auto_delete=True
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def publish_item_changed(kind: str, item_id: int) -> None:
+    """
+    Публикует событие об изменении LostItem (kind="lost") или FoundItem
+    (kind="found"). Недоступность брокера не должна ломать запись предмета,
+    поэтому ошибка публикации только логируется.
+    """
+    try:
+        await router.broker.publish({"kind": kind, "id": item_id}, queue=ITEMS_CHANGED_QUEUE)
+    except Exception:
+        logger.exception("Failed to publish %s item %s event", kind, item_id)
+
+
+async def publish_cache_invalidation(kind: str, item_id: int | None = None) -> None:
+    """
+    Рассылает всем воркерам команду сбросить закэшированную категорию
+    (kind="category") или тег (kind="tag"). Ошибка публикации только
+    логируется: записи в других воркерах устареют не дольше чем на TTL.
+    """
+    try:
+        await router.broker.publish({"kind": kind, "id": item_id}, exchange=CACHE_EXCHANGE)
+    except Exception:
+        logger.exception("Failed to publish %s %s cache invalidation", kind, item_id)
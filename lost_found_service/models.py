@@ -1,8 +1,77 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Table, ForeignKey, func
+from typing import Optional
+
+from sqlalchemy import (
+    Column, Computed, DDL, Integer, String, DateTime, Float, Text, Table, ForeignKey, Index, event, func
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
 
 Base = declarative_base()
 
+# Триграммные индексы (gin_trgm_ops) требуют расширения pg_trgm
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+def search_vector_column():
+    """
+    Полнотекстовый вектор по названию и описанию.
+    Генерируемая колонка: Postgres сам пересчитывает её при INSERT/UPDATE.
+    deferred — чтобы не тянуть её в обычные SELECT.
+    """
+    return mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(description, ''))",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+
+# Счётчик использования тега (tags.usage_count) ведут триггеры на таблицах связей.
+# Триггеры уровня оператора с transition-таблицами: массовая привязка
+# обновляет каждый тег один раз, а не по строке на каждый предмет.
+TAG_USAGE_FUNCTIONS = [
+    DDL("""
+CREATE OR REPLACE FUNCTION tag_usage_increment() RETURNS trigger AS $$
+BEGIN
+    UPDATE tags SET usage_count = tags.usage_count + changed.cnt
+    FROM (SELECT tag_id, count(*) AS cnt FROM new_rows GROUP BY tag_id) AS changed
+    WHERE tags.id = changed.tag_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""),
+    DDL("""
+CREATE OR REPLACE FUNCTION tag_usage_decrement() RETURNS trigger AS $$
+BEGIN
+    UPDATE tags SET usage_count = greatest(tags.usage_count - changed.cnt, 0)
+    FROM (SELECT tag_id, count(*) AS cnt FROM old_rows GROUP BY tag_id) AS changed
+    WHERE tags.id = changed.tag_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""),
+]
+
+for ddl in TAG_USAGE_FUNCTIONS:
+    event.listen(Base.metadata, "before_create", ddl)
+
+
+def tag_usage_triggers(table_name: str) -> list[DDL]:
+    return [
+        DDL(
+            f"CREATE TRIGGER {table_name}_usage_insert AFTER INSERT ON {table_name} "
+            "REFERENCING NEW TABLE AS new_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_increment()"
+        ),
+        DDL(
+            f"CREATE TRIGGER {table_name}_usage_delete AFTER DELETE ON {table_name} "
+            "REFERENCING OLD TABLE AS old_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_decrement()"
+        ),
+    ]
+
 
 # Ассоциативная таблица для LostItem <-> Tag
 lostitem_tag = Table(
@@ -19,14 +88,23 @@ founditem_tag = Table(
     Base.metadata,
     Column("found_item_id", ForeignKey("found_items.id"), primary_key=True),
     Column("tag_id", ForeignKey("tags.id"), primary_key=True),
+    # PK (found_item_id, tag_id) не помогает искать предметы по тегу
+    Index("ix_founditem_tag_tag_id", "tag_id", "found_item_id"),
 )
 
 
+for link_table in (lostitem_tag, founditem_tag):
+    for ddl in tag_usage_triggers(link_table.name):
+        event.listen(link_table, "after_create", ddl)
+
+
 class Tag(Base):
     __tablename__ = "tags"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, unique=True, index=True)
+    # Сколько предметов (lost + found) помечено тегом; ведут триггеры
+    usage_count: Mapped[int] = mapped_column(Integer, server_default="0", default=0)
 
     # Связь только с LostItem (в будущем можно добавить и found_items)
     lost_items: Mapped[list["LostItem"]] = relationship(
@@ -41,6 +119,11 @@ class Tag(Base):
         back_populates="tags"
     )
 
+    __table_args__ = (
+        # GET /tags/popular: ORDER BY usage_count DESC LIMIT N
+        Index("ix_tags_usage_count", usage_count.desc(), "id"),
+    )
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -58,15 +141,35 @@ class LostItem(Base):
     name: Mapped[str] = mapped_column(String, index=True)
     description: Mapped[str] = mapped_column(Text, default='')
     lost_date: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
+    # Версия строки для ETag: меняется при каждом UPDATE
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
     location: Mapped[str] = mapped_column(String)
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
     category: Mapped["Category"] = relationship(back_populates="lost_items")
+    # Когда фоновый обработчик последний раз посчитал совпадения (item_matches);
+    # NULL — ещё не считались, и similar_found_items считает их на лету
+    matches_computed_at: Mapped[Optional[DateTime]] = mapped_column(DateTime, nullable=True)
     # Добавляем связь "tags":
     tags: Mapped[list["Tag"]] = relationship(
         secondary=lostitem_tag,   # та же таблица lostitem_tag
         back_populates="lost_items"
     )
 
+    search_vector: Mapped[str] = search_vector_column()
+
+    __table_args__ = (
+        # Фоновый поиск LostItem для нового FoundItem: категория + окно по дате
+        Index("ix_lost_items_category_id_lost_date", "category_id", "lost_date"),
+        # Поиск по фрагменту локации (ILIKE '%...%') и полнотекстовый поиск (q=)
+        Index(
+            "ix_lost_items_location_trgm", "location",
+            postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"},
+        ),
+        Index("ix_lost_items_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
 
 class FoundItem(Base):
     __tablename__ = "found_items"
@@ -75,6 +178,10 @@ class FoundItem(Base):
     name: Mapped[str] = mapped_column(String, index=True)
     description: Mapped[str] = mapped_column(Text, default='')
     found_date: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
+    # Версия строки для ETag: меняется при каждом UPDATE
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now()
+    )
     location: Mapped[str] = mapped_column(String)
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
     category: Mapped["Category"] = relationship(back_populates='found_items')
@@ -83,3 +190,60 @@ class FoundItem(Base):
         secondary=founditem_tag,   # та же таблица founditem_tag
         back_populates="found_items"
     )
+
+    search_vector: Mapped[str] = search_vector_column()
+
+    __table_args__ = (
+        # Отбор кандидатов для поиска похожих: категория + окно по дате
+        Index("ix_found_items_category_id_found_date", "category_id", "found_date"),
+        # Поиск по фрагменту локации (ILIKE '%...%') и полнотекстовый поиск (q=)
+        Index(
+            "ix_found_items_location_trgm", "location",
+            postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"},
+        ),
+        Index("ix_found_items_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+class SimilarityScore(Base):
+    """
+    Кэш оценок ChatGPT: ключ — sha256 от модели и текстов пары
+    (LostItem, FoundItem). Изменение предмета меняет текст, а значит и ключ,
+    поэтому устаревшие оценки просто перестают находиться.
+    """
+    __tablename__ = "similarity_scores"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    score: Mapped[float] = mapped_column(Float)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+
+class ItemMatch(Base):
+    """
+    Заранее посчитанные совпадения LostItem <-> FoundItem.
+    Заполняется фоновым обработчиком событий из RabbitMQ.
+    """
+    __tablename__ = "item_matches"
+
+    lost_item_id: Mapped[int] = mapped_column(
+        ForeignKey("lost_items.id", ondelete="CASCADE"), primary_key=True
+    )
+    found_item_id: Mapped[int] = mapped_column(
+        ForeignKey("found_items.id", ondelete="CASCADE"), primary_key=True
+    )
+    score: Mapped[float] = mapped_column(Float)
+    computed_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        # Пересчёт совпадений FoundItem и каскадное удаление
+        Index("ix_item_matches_found_item_id", "found_item_id"),
+    )
+
+
+# Чтение совпадений LostItem по убыванию оценки (keyset-пагинация)
+Index(
+    "ix_item_matches_lost_item_id_score",
+    ItemMatch.lost_item_id,
+    ItemMatch.score.desc(),
+    ItemMatch.found_item_id,
+)
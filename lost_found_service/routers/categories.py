@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from config import settings
 from database import get_db
 import models
 import schemas
+from utils.http_cache import make_etag, not_modified_response
+from utils.reference_cache import get_category, invalidate
 
 
 router = APIRouter()
@@ -25,11 +28,21 @@ async def create_category(
 
 
 @router.get("/{category_id}", response_model=schemas.CategoryRead)
-async def read_category(category_id: int, db: AsyncSession = Depends(get_db)):
-    category = await db.execute(select(models.Category).where(models.Category.id == category_id))
-    category = category.scalar_one_or_none()
+async def read_category(
+        category_id: int,
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+):
+    category = await get_category(db, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
+
+    # Категория берётся из кэша процесса, ETag — хэш её полей
+    etag = make_etag(category.model_dump())
+    not_modified = not_modified_response(request, response, etag, settings.http_reference_max_age)
+    if not_modified is not None:
+        return not_modified
     return category
 
 
@@ -51,6 +64,7 @@ async def update_category(
 
     await db.commit()
     await db.refresh(category)
+    await invalidate("category", category_id)
     return category
 
 
@@ -68,4 +82,5 @@ async def delete_category(
 
     await db.delete(category)
     await db.commit()
+    await invalidate("category", category_id)
     return {"message": "Category deleted"}
\ No newline at end of file
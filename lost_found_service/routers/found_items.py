@@ -1,12 +1,24 @@
 import schemas
 import models
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload  # <-- добавили
-from typing import Optional
+from typing import Literal, Optional
+from config import settings
 from database import get_db
+from broker import publish_item_changed
+from utils.export import EXPORT_MEDIA_TYPES, stream_export
+from utils.pagination import keyset_paginate, sort_column, split_page
+from utils.items import (
+    bulk_create_items, is_foreign_key_violation, item_columns, read_bulk_body,
+    sparse_columns, sparse_response, tags_json,
+)
+from utils.http_cache import make_etag, not_modified_response
 from utils.security import get_token_data
+from utils.similarity import index_found_item, unindex_found_item
 
 router = APIRouter()
 
@@ -17,79 +29,169 @@ async def create_found_item(
         db: AsyncSession = Depends(get_db),
         token_data: schemas.TokenData = Depends(get_token_data)
 ):
-    # Проверяем, существует ли категория
-    category = await db.execute(
-        select(models.Category).where(models.Category.id == item.category_id)
-    )
-    category = category.scalar_one_or_none()
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
+    """
+    Создаёт FoundItem одним запросом INSERT ... RETURNING.
+    Существование категории проверяет внешний ключ: его нарушение — 404.
+    """
+    try:
+        result = await db.execute(
+            insert(models.FoundItem)
+            .values(**item.model_dump(exclude_none=True))
+            .returning(*item_columns(models.FoundItem))
+        )
+        row = result.mappings().one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=404, detail="Category not found")
+        raise
+
+    # У нового предмета ещё нет тегов — повторный SELECT не нужен
+    db_item = schemas.FoundItem(**row, tags=[])
+
+    # Добавляем строку в индекс похожих предметов
+    await index_found_item(db, db_item)
+    # Совпадения с LostItem считаются в фоне
+    await publish_item_changed("found", db_item.id)
+    return db_item
 
-    # Создаём новую запись FoundItem
-    db_item = models.FoundItem(**item.model_dump())
-    db.add(db_item)
-    await db.commit()
-    await db.refresh(db_item)
 
-    # Явно загружаем связь tags через selectinload
-    result = await db.execute(
-        select(models.FoundItem)
-        .options(selectinload(models.FoundItem.tags))
-        .where(models.FoundItem.id == db_item.id)
+@router.post("/bulk", response_model=schemas.BulkCreateResult)
+async def bulk_create_found_items(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        token_data: schemas.TokenData = Depends(get_token_data)
+):
+    """
+    Создаёт много FoundItem за один запрос.
+    Тело — JSON-массив объектов FoundItemCreate или NDJSON
+    (Content-Type: application/x-ndjson). Невалидные строки
+    не мешают остальным: для каждой строки возвращается id или ошибка.
+    """
+    rows = await read_bulk_body(request)
+    results, created = await bulk_create_items(db, models.FoundItem, schemas.FoundItemCreate, rows)
+
+    for row in created:
+        # Новые строки сразу попадают в индекс похожих предметов
+        await index_found_item(db, schemas.FoundItem(**row, tags=[]))
+        await publish_item_changed("found", row["id"])
+
+    return schemas.BulkCreateResult(
+        created=len(created), failed=len(results) - len(created), results=results
     )
-    db_item = result.scalar_one_or_none()
-    return db_item
 
 
 @router.get("/", response_model=list[schemas.FoundItem])
 async def read_found_items(
+        response: Response,
         db: AsyncSession = Depends(get_db),
         skip: int = Query(0, ge=0, description="Сколько записей пропустить"),
         limit: int = Query(10, gt=0, description="Сколько записей вернуть"),
         category_id: Optional[int] = Query(None, description="Фильтрация по категории"),
         location: Optional[str] = Query(None, description="Фильтрация по локации (фрагмент)"),
+        q: Optional[str] = Query(None, description="Полнотекстовый поиск по названию и описанию"),
         order_by: Optional[str] = Query(None, description="Поле для сортировки, например 'found_date'"),
         sort_desc: bool = Query(False, description="Сортировать по убыванию, если True"),
+        use_cursor: bool = Query(False, description="Пагинация по курсору вместо skip"),
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+        fields: Optional[str] = Query(None, description="Только эти поля через запятую, например 'id,name,location'"),
+        include: Optional[str] = Query(None, description="Встроить связанные данные: 'tags'"),
         # token_data: schemas.TokenData = Depends(get_token_data)
 ):
     """
     Возвращает список найденных вещей (FoundItem) с поддержкой:
-    - Пагинации (skip, limit)
+    - Пагинации (skip, limit) или по курсору (use_cursor/cursor, limit):
+      курсор следующей страницы возвращается в заголовке X-Next-Cursor
     - Фильтрации (category_id, location)
+    - Полнотекстового поиска (q) с сортировкой по релевантности,
+      если order_by не задан (в режиме курсора q работает только как фильтр)
     - Сортировки (order_by, sort_desc)
+    - Выбора полей (fields) и встраивания тегов (include=tags): SELECT
+      содержит только запрошенные колонки, теги без include не загружаются,
+      строки кодируются сразу в JSON через orjson (быстрый путь)
 
     🔐 Только для авторизованных пользователей.
     """
 
-    # Главная разница: добавляем options(selectinload)
-    query = (
-        select(models.FoundItem)
-        .options(selectinload(models.FoundItem.tags))
-    )
+    sparse = fields is not None or include is not None
+    if sparse:
+        # Только запрошенные колонки; для курсора нужна и колонка сортировки
+        required = (sort_column(models.FoundItem, order_by).key,) if use_cursor or cursor else ()
+        query = select(*sparse_columns(models.FoundItem, fields, include, required))
+    else:
+        # Главная разница: добавляем options(selectinload)
+        query = (
+            select(models.FoundItem)
+            .options(selectinload(models.FoundItem.tags))
+        )
 
     # Фильтрация по category_id, если указано
     if category_id is not None:
         query = query.where(models.FoundItem.category_id == category_id)
 
-    # Фильтрация по location (текстовое вхождение), если указано
+    # Фильтрация по location (текстовое вхождение, триграммный GIN-индекс), если указано
     if location:
         query = query.where(models.FoundItem.location.ilike(f"%{location}%"))
 
+    # Полнотекстовый поиск (GIN-индекс по search_vector), если указано
+    ts_query = None
+    if q:
+        ts_query = func.websearch_to_tsquery("russian", q)
+        query = query.where(models.FoundItem.search_vector.op("@@")(ts_query))
+
+    # Пагинация по курсору: сортировка по (order_by, id) и условие "после курсора"
+    if use_cursor or cursor:
+        column_attr = sort_column(models.FoundItem, order_by)
+        query = keyset_paginate(query, column_attr, models.FoundItem.id, sort_desc, cursor, limit)
+        result = await db.execute(query)
+        rows = result.all() if sparse else result.scalars().all()
+        items, next_cursor = split_page(rows, limit, column_attr.key)
+        if sparse:
+            return sparse_response(items, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return items
+
     # Сортировка
     if order_by:
         # Проверяем, есть ли такое поле у FoundItem
         column_attr = getattr(models.FoundItem, order_by, None)
         if column_attr is not None:
             query = query.order_by(column_attr.desc() if sort_desc else column_attr.asc())
+    elif ts_query is not None:
+        # Без явной сортировки — сначала самые релевантные
+        query = query.order_by(
+            func.ts_rank(models.FoundItem.search_vector, ts_query).desc(), models.FoundItem.id
+        )
 
     # Пагинация
     query = query.offset(skip).limit(limit)
 
     result = await db.execute(query)
+    if sparse:
+        return sparse_response(result.all())
     items = result.scalars().all()
     return items
 
 
+@router.get("/export")
+async def export_found_items(
+        db: AsyncSession = Depends(get_db),
+        format: Literal["ndjson", "csv"] = Query("ndjson", description="Формат выгрузки"),
+        category_id: Optional[int] = Query(None, description="Фильтрация по категории"),
+):
+    """
+    Выгрузка всех найденных вещей (FoundItem) с тегами в NDJSON или CSV.
+    Ответ отдаётся потоком, строки читаются из базы серверным курсором.
+    """
+    return StreamingResponse(
+        stream_export(db.bind, models.FoundItem, format, category_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="found_items.{format}"'},
+    )
+
+
 # -----------------------------------------------------------------------------
 # Метод "привязать тег" (POST /found_items/{found_item_id}/tags?tag_id=...)
 # -----------------------------------------------------------------------------
@@ -122,7 +224,10 @@ async def attach_tag_to_found_item(
     if tag not in found_item.tags:
         found_item.tags.append(tag)
         await db.commit()
+        await index_found_item(db, found_item)
         await db.refresh(found_item)
+        # Теги входят в вектор предмета — пересчитываем его совпадения
+        await publish_item_changed("found", found_item_id)
 
     return found_item
 
@@ -162,6 +267,8 @@ async def detach_tag_from_found_item(
     if tag in found_item.tags:
         found_item.tags.remove(tag)
         await db.commit()
+        await index_found_item(db, found_item)
+        await publish_item_changed("found", found_item_id)
 
     return {"detail": "Tag detached from FoundItem"}
 
@@ -169,18 +276,29 @@ async def detach_tag_from_found_item(
 @router.get("/{item_id}", response_model=schemas.FoundItem)
 async def read_found_item(
         item_id: int,
+        request: Request,
+        response: Response,
         db: AsyncSession = Depends(get_db),
         # token_data: schemas.TokenData = Depends(get_token_data)
 ):
+    """
+    Предмет вместе с тегами одним запросом.
+    ETag строится из updated_at и тегов: если у клиента та же версия
+    (If-None-Match), возвращаем 304 без сериализации.
+    """
     result = await db.execute(
-        select(models.FoundItem)
-        .options(selectinload(models.FoundItem.tags))
+        select(*item_columns(models.FoundItem), tags_json(models.FoundItem))
         .where(models.FoundItem.id == item_id)
     )
-    item = result.scalar_one_or_none()
-    if item is None:
+    row = result.mappings().one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return item
+
+    etag = make_etag(row["id"], row["updated_at"], row["tags"])
+    not_modified = not_modified_response(request, response, etag, settings.http_item_max_age)
+    if not_modified is not None:
+        return not_modified
+    return schemas.FoundItem(**row)
 
 
 @router.put("/{item_id}", response_model=schemas.FoundItem)
@@ -190,21 +308,34 @@ async def update_found_item(
         db: AsyncSession = Depends(get_db),
         token_data: schemas.TokenData = Depends(get_token_data)
 ):
-    db_item = await db.get(models.FoundItem, item_id)
-    if db_item is None:
+    """
+    Обновляет FoundItem одним запросом UPDATE ... RETURNING,
+    теги возвращаются подзапросом в том же RETURNING.
+    """
+    values = item.model_dump(exclude_none=True)
+    returning = [*item_columns(models.FoundItem), tags_json(models.FoundItem)]
+    if values:
+        query = (
+            update(models.FoundItem)
+            .where(models.FoundItem.id == item_id)
+            .values(**values)
+            .returning(*returning)
+        )
+    else:
+        # Обновлять нечего — просто читаем предмет
+        query = select(*returning).where(models.FoundItem.id == item_id)
+
+    result = await db.execute(query)
+    row = result.mappings().one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    for field, value in item.model_dump(exclude_none=True).items():
-        setattr(db_item, field, value)
     await db.commit()
-    await db.refresh(db_item)
 
-    # Выполняем повторный запрос с eager loading для поля tags
-    result = await db.execute(
-        select(models.FoundItem)
-        .options(selectinload(models.FoundItem.tags))
-        .where(models.FoundItem.id == item_id)
-    )
-    db_item = result.scalar_one_or_none()
+    db_item = schemas.FoundItem(**row)
+
+    # Обновляем строку в индексе похожих предметов
+    await index_found_item(db, db_item)
+    await publish_item_changed("found", db_item.id)
     return db_item
 
 
@@ -219,4 +350,5 @@ async def delete_found_item(
         raise HTTPException(status_code=404, detail="Item not found")
     await db.delete(db_item)
     await db.commit()
+    await unindex_found_item(db, item_id)
     return {"message": "Item deleted"}
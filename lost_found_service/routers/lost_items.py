@@ -1,13 +1,30 @@
 import schemas
 import models
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Header, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload  # <-- добавили
-from typing import Optional
+from typing import Literal, Optional
+from config import settings
 from database import get_db
+from broker import publish_item_changed
+from utils.export import EXPORT_MEDIA_TYPES, stream_export
+from utils.pagination import (
+    _cursor_value, decode_cursor, encode_cursor, keyset_paginate, sort_column, split_page
+)
+from utils.items import (
+    bulk_create_items, is_foreign_key_violation, item_columns, read_bulk_body,
+    sparse_columns, sparse_response, tags_json,
+)
+from utils.http_cache import make_etag, not_modified_response
 from utils.security import get_token_data
-from utils.chatgpt import chatgpt_similarity
+from utils.chatgpt import cancel_on_disconnect
+from utils.score_cache import cached_score_pairs
+from utils.similarity import (
+    found_candidates_query, get_found_index, render_item_text, vectorize_item
+)
 import schemas
 
 router = APIRouter()
@@ -19,61 +36,124 @@ async def create_lost_item(
         db: AsyncSession = Depends(get_db),
         token_data: schemas.TokenData = Depends(get_token_data)
 ):
-    # Проверка существования категории
-    category = await db.execute(
-        select(models.Category).where(models.Category.id == item.category_id)
-    )
-    category = category.scalar_one_or_none()
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
+    """
+    Создаёт LostItem одним запросом INSERT ... RETURNING.
+    Существование категории проверяет внешний ключ: его нарушение — 404.
+    """
+    try:
+        result = await db.execute(
+            insert(models.LostItem)
+            .values(**item.model_dump(exclude_none=True))
+            .returning(*item_columns(models.LostItem))
+        )
+        row = result.mappings().one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=404, detail="Category not found")
+        raise
 
-    db_item = models.LostItem(**item.model_dump())
-    db.add(db_item)
-    await db.commit()
-    await db.refresh(db_item)
+    # У нового предмета ещё нет тегов — повторный SELECT не нужен
+    db_item = schemas.LostItem(**row, tags=[])
 
-    # Явно загружаем связь tags через selectinload
-    result = await db.execute(
-        select(models.LostItem)
-        .options(selectinload(models.LostItem.tags))
-        .where(models.LostItem.id == db_item.id)
-    )
-    db_item = result.scalar_one_or_none()
+    # Совпадения с FoundItem считаются в фоне
+    await publish_item_changed("lost", db_item.id)
     return db_item
 
 
+@router.post("/bulk", response_model=schemas.BulkCreateResult)
+async def bulk_create_lost_items(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        token_data: schemas.TokenData = Depends(get_token_data)
+):
+    """
+    Создаёт много LostItem за один запрос.
+    Тело — JSON-массив объектов LostItemCreate или NDJSON
+    (Content-Type: application/x-ndjson). Невалидные строки
+    не мешают остальным: для каждой строки возвращается id или ошибка.
+    """
+    rows = await read_bulk_body(request)
+    results, created = await bulk_create_items(db, models.LostItem, schemas.LostItemCreate, rows)
+
+    for row in created:
+        await publish_item_changed("lost", row["id"])
+
+    return schemas.BulkCreateResult(
+        created=len(created), failed=len(results) - len(created), results=results
+    )
+
+
 @router.get("/", response_model=list[schemas.LostItem])
 async def read_lost_items(
+        response: Response,
         db: AsyncSession = Depends(get_db),
         skip: int = Query(0, ge=0, description="Сколько записей пропустить"),
         limit: int = Query(10, gt=0, description="Сколько записей вернуть"),
         category_id: Optional[int] = Query(None, description="Фильтрация по категории"),
         location: Optional[str] = Query(None, description="Фильтрация по локации (фрагмент)"),
+        q: Optional[str] = Query(None, description="Полнотекстовый поиск по названию и описанию"),
         order_by: Optional[str] = Query(None, description="Поле для сортировки, например 'lost_date'"),
         sort_desc: bool = Query(False, description="Сортировать по убыванию, если True"),
+        use_cursor: bool = Query(False, description="Пагинация по курсору вместо skip"),
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+        fields: Optional[str] = Query(None, description="Только эти поля через запятую, например 'id,name,location'"),
+        include: Optional[str] = Query(None, description="Встроить связанные данные: 'tags'"),
         # token_data: schemas.TokenData = Depends(get_token_data),
 ):
     """
     Возвращает список потерянных вещей (LostItem) с поддержкой:
-    - Пагинации (skip, limit)
+    - Пагинации (skip, limit) или по курсору (use_cursor/cursor, limit):
+      курсор следующей страницы возвращается в заголовке X-Next-Cursor
     - Фильтрации (category_id, location)
+    - Полнотекстового поиска (q) с сортировкой по релевантности,
+      если order_by не задан (в режиме курсора q работает только как фильтр)
     - Сортировки (order_by, sort_desc)
+    - Выбора полей (fields) и встраивания тегов (include=tags): SELECT
+      содержит только запрошенные колонки, теги без include не загружаются,
+      строки кодируются сразу в JSON через orjson (быстрый путь)
     """
 
-    # Главная разница: добавляем options(selectinload)
-    query = (
-        select(models.LostItem)
-        .options(selectinload(models.LostItem.tags))
-    )
+    sparse = fields is not None or include is not None
+    if sparse:
+        # Только запрошенные колонки; для курсора нужна и колонка сортировки
+        required = (sort_column(models.LostItem, order_by).key,) if use_cursor or cursor else ()
+        query = select(*sparse_columns(models.LostItem, fields, include, required))
+    else:
+        # Главная разница: добавляем options(selectinload)
+        query = (
+            select(models.LostItem)
+            .options(selectinload(models.LostItem.tags))
+        )
 
     # Фильтрация по category_id
     if category_id is not None:
         query = query.where(models.LostItem.category_id == category_id)
 
-    # Фильтрация по location (текстовое вхождение)
+    # Фильтрация по location (текстовое вхождение, триграммный GIN-индекс)
     if location:
         query = query.where(models.LostItem.location.ilike(f"%{location}%"))
 
+    # Полнотекстовый поиск (GIN-индекс по search_vector)
+    ts_query = None
+    if q:
+        ts_query = func.websearch_to_tsquery("russian", q)
+        query = query.where(models.LostItem.search_vector.op("@@")(ts_query))
+
+    # Пагинация по курсору: сортировка по (order_by, id) и условие "после курсора"
+    if use_cursor or cursor:
+        column_attr = sort_column(models.LostItem, order_by)
+        query = keyset_paginate(query, column_attr, models.LostItem.id, sort_desc, cursor, limit)
+        result = await db.execute(query)
+        rows = result.all() if sparse else result.scalars().all()
+        items, next_cursor = split_page(rows, limit, column_attr.key)
+        if sparse:
+            return sparse_response(items, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return items
+
     # Сортировка
     if order_by:
         # Проверяем, действительно ли такое поле есть у модели LostItem
@@ -83,15 +163,39 @@ async def read_lost_items(
                 query = query.order_by(column_attr.desc())
             else:
                 query = query.order_by(column_attr.asc())
+    elif ts_query is not None:
+        # Без явной сортировки — сначала самые релевантные
+        query = query.order_by(
+            func.ts_rank(models.LostItem.search_vector, ts_query).desc(), models.LostItem.id
+        )
 
     # Пагинация
     query = query.offset(skip).limit(limit)
 
     result = await db.execute(query)
+    if sparse:
+        return sparse_response(result.all())
     items = result.scalars().all()
     return items
 
 
+@router.get("/export")
+async def export_lost_items(
+        db: AsyncSession = Depends(get_db),
+        format: Literal["ndjson", "csv"] = Query("ndjson", description="Формат выгрузки"),
+        category_id: Optional[int] = Query(None, description="Фильтрация по категории"),
+):
+    """
+    Выгрузка всех потерянных вещей (LostItem) с тегами в NDJSON или CSV.
+    Ответ отдаётся потоком, строки читаются из базы серверным курсором.
+    """
+    return StreamingResponse(
+        stream_export(db.bind, models.LostItem, format, category_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="lost_items.{format}"'},
+    )
+
+
 # -----------------------------------------------------------------------------
 # Метод "привязать тег" (POST /lost_items/{lost_item_id}/tags?tag_id=...)
 # -----------------------------------------------------------------------------
@@ -125,6 +229,8 @@ async def attach_tag_to_lost_item(
         lost_item.tags.append(tag)
         await db.commit()
         await db.refresh(lost_item)
+        # Теги входят в вектор предмета — пересчитываем его совпадения
+        await publish_item_changed("lost", lost_item_id)
 
     return lost_item
 
@@ -164,6 +270,7 @@ async def detach_tag_from_lost_item(
     if tag in lost_item.tags:
         lost_item.tags.remove(tag)
         await db.commit()
+        await publish_item_changed("lost", lost_item_id)
 
     return {"detail": "Tag detached from LostItem"}
 
@@ -171,18 +278,29 @@ async def detach_tag_from_lost_item(
 @router.get("/{item_id}", response_model=schemas.LostItem)
 async def read_lost_item(
         item_id: int,
+        request: Request,
+        response: Response,
         db: AsyncSession = Depends(get_db),
         # token_data: schemas.TokenData = Depends(get_token_data)
 ):
+    """
+    Предмет вместе с тегами одним запросом.
+    ETag строится из updated_at и тегов: если у клиента та же версия
+    (If-None-Match), возвращаем 304 без сериализации.
+    """
     result = await db.execute(
-        select(models.LostItem)
-        .options(selectinload(models.LostItem.tags))
+        select(*item_columns(models.LostItem), tags_json(models.LostItem))
         .where(models.LostItem.id == item_id)
     )
-    item = result.scalar_one_or_none()
-    if item is None:
+    row = result.mappings().one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return item
+
+    etag = make_etag(row["id"], row["updated_at"], row["tags"])
+    not_modified = not_modified_response(request, response, etag, settings.http_item_max_age)
+    if not_modified is not None:
+        return not_modified
+    return schemas.LostItem(**row)
 
 
 @router.put("/{item_id}", response_model=schemas.LostItem)
@@ -192,23 +310,32 @@ async def update_lost_item(
         db: AsyncSession = Depends(get_db),
         token_data: schemas.TokenData = Depends(get_token_data)
 ):
-    db_item = await db.get(models.LostItem, item_id)
-    if db_item is None:
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    for field, value in item.model_dump(exclude_none=True).items():
-        setattr(db_item, field, value)
+    """
+    Обновляет LostItem одним запросом UPDATE ... RETURNING,
+    теги возвращаются подзапросом в том же RETURNING.
+    """
+    values = item.model_dump(exclude_none=True)
+    returning = [*item_columns(models.LostItem), tags_json(models.LostItem)]
+    if values:
+        query = (
+            update(models.LostItem)
+            .where(models.LostItem.id == item_id)
+            .values(**values)
+            .returning(*returning)
+        )
+    else:
+        # Обновлять нечего — просто читаем предмет
+        query = select(*returning).where(models.LostItem.id == item_id)
 
+    result = await db.execute(query)
+    row = result.mappings().one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Item not found")
     await db.commit()
-    await db.refresh(db_item)
 
-    # Выполняем повторный запрос с eager loading для поля tags
-    result = await db.execute(
-        select(models.FoundItem)
-        .options(selectinload(models.FoundItem.tags))
-        .where(models.FoundItem.id == item_id)
-    )
-    db_item = result.scalar_one_or_none()
+    db_item = schemas.LostItem(**row)
+
+    await publish_item_changed("lost", item_id)
     return db_item
 
 
@@ -230,17 +357,46 @@ async def delete_lost_item(
 @router.get("/{lost_item_id}/similar_found_items")
 async def get_similar_found_items(
     lost_item_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    top_k: int = Query(5, description="Сколько максимально похожих вернуть"),
+    top_k: int = Query(5, gt=0, description="Сколько максимально похожих вернуть"),
+    rerank: bool = Query(False, description="Переоценить лучших кандидатов через ChatGPT"),
+    rerank_pool: int = Query(20, gt=0, description="Сколько лучших кандидатов отдать на переоценку ChatGPT"),
+    category_id: Optional[int] = Query(None, description="Искать только в этой категории"),
+    same_category: bool = Query(True, description="Искать только в категории LostItem (если category_id не задан)"),
+    days_before: int = Query(settings.match_days_before, ge=0, description="Искать только найденное не раньше, чем за N дней до потери"),
+    any_date: bool = Query(False, description="Не ограничивать дату находки"),
+    shared_tags: bool = Query(False, description="Искать только среди предметов с общими тегами"),
+    precomputed: bool = Query(True, description="Использовать совпадения, посчитанные в фоне, если они есть"),
     # token_data: schemas.TokenData = Depends(get_token_data)  # если нужна авторизация
 ):
     """
-    Для данного LostItem вызываем ChatGPT (модель ChatCompletion)
-    и сравниваем его с каждым FoundItem.
+    Для данного LostItem ищем похожие FoundItem по векторам признаков
+    (название, описание, категория, теги): все найденные предметы
+    оцениваются одним матричным умножением, без обращений к ChatGPT.
     Возвращаем top_k найденных предметов с наибольшим 'процентом совпадения'.
-    (На каждый FoundItem уходит отдельный запрос к ChatGPT!)
+
+    При rerank=True ChatGPT переоценивает только rerank_pool лучших кандидатов.
+
+    Перед оценкой кандидаты отсекаются в SQL (по индексам):
+    по умолчанию — та же категория и дата находки не раньше,
+    чем за days_before дней до потери; опционально — общие теги.
+
+    Если фильтры не изменены и rerank не нужен, ответ берётся из таблицы
+    item_matches, которую заполняет фоновый обработчик событий RabbitMQ
+    (один индексный запрос вместо расчёта), даже если он пуст. На лету
+    совпадения вычисляются, только пока фоновый пересчёт ещё не выполнялся.
+    Там хранится не больше match_top_n совпадений, поэтому при precomputed=True
+    больший top_k отклоняется (400).
     """
 
+    # В item_matches хранится не больше match_top_n совпадений на LostItem
+    if precomputed and top_k > settings.match_top_n:
+        raise HTTPException(
+            status_code=400,
+            detail=f"top_k must not exceed {settings.match_top_n} for precomputed matches",
+        )
+
     # 1) Ищем LostItem
     result = await db.execute(
         select(models.LostItem)
@@ -254,55 +410,150 @@ async def get_similar_found_items(
     if not lost_item:
         raise HTTPException(status_code=404, detail="LostItem not found")
 
-    # 2) Формируем текст LostItem
-    lost_parts = [
-        f"Название: {lost_item.name}",
-        f"Описание: {lost_item.description or ''}"
-    ]
-    if lost_item.category:
-        lost_parts.append(f"Категория: {lost_item.category.name}")
-    if lost_item.tags:
-        tag_names = ", ".join(tag.name for tag in lost_item.tags)
-        lost_parts.append(f"Теги: {tag_names}")
-    lost_text = "\n".join(lost_parts)
-
-    # 3) Берём все FoundItem (можете сделать фильтры, если нужно)
+    # 1.1) Совпадения, уже посчитанные в фоне (те же фильтры по умолчанию)
+    default_filters = (
+        category_id is None and same_category and not shared_tags
+        and not any_date and days_before == settings.match_days_before
+    )
+    if precomputed and default_filters and not rerank:
+        matches = await db.execute(
+            select(models.FoundItem, models.ItemMatch.score)
+            .join(models.ItemMatch, models.ItemMatch.found_item_id == models.FoundItem.id)
+            .options(selectinload(models.FoundItem.tags))
+            .where(models.ItemMatch.lost_item_id == lost_item_id)
+            .order_by(models.ItemMatch.score.desc())
+            .limit(top_k)
+        )
+        scored_items = matches.all()
+        # Пустой список после пересчёта — тоже ответ: ни одна находка
+        # не набрала match_min_score, считать заново на каждом запросе незачем
+        if scored_items or lost_item.matches_computed_at is not None:
+            return _similar_items_response(scored_items)
+
+    # 2) Отбираем кандидатов фильтрами в SQL
+    if category_id is None and same_category:
+        category_id = lost_item.category_id
+    candidates_query = found_candidates_query(
+        lost_item,
+        category_id=category_id,
+        days_before=None if any_date else days_before,
+        shared_tags=shared_tags,
+    )
+    candidate_ids = None
+    if candidates_query is not None:
+        candidate_ids = (await db.execute(candidates_query)).scalars().all()
+        if not candidate_ids:
+            return []
+
+    # 3) Векторный поиск среди кандидатов по поддерживаемому индексу FoundItem
+    index = await get_found_index(db)
+    pool_size = max(top_k, rerank_pool) if rerank else top_k
+    candidates = index.search(vectorize_item(lost_item), pool_size, candidate_ids)
+    if not candidates:
+        return []
+
+    # 4) Загружаем из БД только отобранных кандидатов
     found_result = await db.execute(
         select(models.FoundItem)
         .options(
             selectinload(models.FoundItem.tags),
             selectinload(models.FoundItem.category)
         )
+        .where(models.FoundItem.id.in_([item_id for item_id, _ in candidates]))
     )
-    found_items = found_result.scalars().all()
-    if not found_items:
-        return []
+    found_items = {item.id: item for item in found_result.scalars().all()}
+    scored_items = [
+        (found_items[item_id], score * 100)
+        for item_id, score in candidates
+        if item_id in found_items
+    ]
 
-    # 4) Для каждого FoundItem формируем prompt и вызываем ChatGPT
-    scored_items = []
-    for f_item in found_items:
-        found_parts = [
-            f"Название: {f_item.name}",
-            f"Описание: {f_item.description or ''}"
-        ]
-        if f_item.category:
-            found_parts.append(f"Категория: {f_item.category.name}")
-        if f_item.tags:
-            ftags = ", ".join(tag.name for tag in f_item.tags)
-            found_parts.append(f"Теги: {ftags}")
-        found_text = "\n".join(found_parts)
+    # 5) (Опционально) переоценка лучших кандидатов через ChatGPT
+    #    Запросы выполняются параллельно и отменяются, если клиент отключился;
+    #    уже оценённые пары берутся из кэша.
+    if rerank:
+        lost_text = render_item_text(lost_item)
+        scores = await cancel_on_disconnect(
+            request,
+            cached_score_pairs(
+                db, [(lost_text, render_item_text(f_item)) for f_item, _ in scored_items]
+            )
+        )
+        scored_items = [(f_item, score) for (f_item, _), score in zip(scored_items, scores)]
+        scored_items.sort(key=lambda x: x[1], reverse=True)
 
-        # Вызываем ChatGPT, получаем число 0..100
-        similarity_score = chatgpt_similarity(lost_text, found_text)
+    # 6) Формируем ответ (берём первые top_k)
+    return _similar_items_response(scored_items[:top_k])
 
-        scored_items.append((f_item, similarity_score))
 
-    # 5) Сортируем по убыванию
-    scored_items.sort(key=lambda x: x[1], reverse=True)
+@router.get("/{lost_item_id}/matches", response_model=schemas.ItemMatchPage)
+async def read_lost_item_matches(
+    lost_item_id: int,
+    db: AsyncSession = Depends(get_db),
+    min_score: float = Query(0, ge=0, le=100, description="Минимальный процент совпадения"),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    limit: int = Query(10, gt=0, le=100, description="Сколько записей вернуть"),
+):
+    """
+    Совпадения LostItem, посчитанные в фоне, по убыванию оценки.
+    Пагинация по курсору (score, found_item_id): каждая страница —
+    один проход по индексу ix_item_matches_lost_item_id_score,
+    время ответа не зависит ни от глубины страницы, ни от числа FoundItem.
+    """
+    lost_item = await db.get(models.LostItem, lost_item_id)
+    if lost_item is None:
+        raise HTTPException(status_code=404, detail="LostItem not found")
 
-    # 6) Формируем ответ (берём первые top_k)
+    query = (
+        select(models.ItemMatch, models.FoundItem)
+        .join(models.FoundItem, models.ItemMatch.found_item_id == models.FoundItem.id)
+        .options(selectinload(models.FoundItem.tags))
+        .where(
+            models.ItemMatch.lost_item_id == lost_item_id,
+            models.ItemMatch.score >= min_score,
+        )
+    )
+    if cursor:
+        last_score, last_found_item_id = decode_cursor(cursor, 2)
+        last_score = _cursor_value(models.ItemMatch.score, last_score)
+        last_found_item_id = _cursor_value(models.ItemMatch.found_item_id, last_found_item_id)
+        query = query.where(
+            or_(
+                models.ItemMatch.score < last_score,
+                and_(
+                    models.ItemMatch.score == last_score,
+                    models.ItemMatch.found_item_id > last_found_item_id,
+                ),
+            )
+        )
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    query = (
+        query.order_by(models.ItemMatch.score.desc(), models.ItemMatch.found_item_id)
+        .limit(limit + 1)
+    )
+
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_match = rows[-1][0]
+        next_cursor = encode_cursor(last_match.score, last_match.found_item_id)
+
+    return {
+        "items": [
+            {"found_item": found_item, "score": match.score, "computed_at": match.computed_at}
+            for match, found_item in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+def _similar_items_response(scored_items) -> list[dict]:
+    """
+    Ответ similar_found_items по списку пар (FoundItem, процент совпадения).
+    """
     results = []
-    for item, score in scored_items[:top_k]:
+    for item, score in scored_items:
         # Конвертируем FoundItem в pydantic-модель (schemas.FoundItem)
         item_data = schemas.FoundItem(
             id=item.id,
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import delete, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 
+from broker import publish_item_changed
+from config import settings
 from database import get_db
 import models
 import schemas
+from utils.http_cache import make_etag, not_modified_response
+from utils.items import is_foreign_key_violation
+from utils.pagination import decode_cursor, encode_cursor
+from utils.reference_cache import get_tag, get_tag_index, invalidate
+from utils.security import get_token_data
+from utils.similarity import reindex_found_items
 
 
 router = APIRouter()
@@ -34,24 +44,76 @@ async def create_tag(
     db.add(new_tag)
     await db.commit()
     await db.refresh(new_tag)
+    await invalidate("tag", new_tag.id)
     return new_tag
 
 
 @router.get("/", response_model=List[schemas.TagRead])
 async def read_tags(
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(100, gt=0, le=1000, description="Сколько тегов вернуть"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
 ):
     """
-    Возвращаем список всех тегов в базе.
+    Возвращаем теги постранично в порядке id.
+    Курсор следующей страницы — в заголовке X-Next-Cursor.
+    Поддерживает If-None-Match: при неизменном списке — 304.
     """
-    result = await db.execute(select(models.Tag))
-    tags = result.scalars().all()
+    after_id = decode_cursor(cursor, 1)[0] if cursor else None
+    if after_id is not None and not isinstance(after_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    index = await get_tag_index(db)
+    etag = make_etag(index.etag, after_id, limit)
+    not_modified = not_modified_response(request, response, etag, settings.http_reference_max_age)
+    if not_modified is not None:
+        return not_modified
+
+    tags, last_id = index.page(after_id, limit)
+    if last_id is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(last_id)
     return tags
 
 
+@router.get("/autocomplete", response_model=List[schemas.TagRead])
+async def autocomplete_tags(
+    prefix: str = Query(..., min_length=1, description="Начало имени тега"),
+    limit: int = Query(10, gt=0, le=50, description="Сколько подсказок вернуть"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Подсказки тегов по началу имени (без учёта регистра).
+    Ищем бинарным поиском по отсортированному списку в памяти процесса,
+    в базу идём только при пустом кэше.
+    """
+    index = await get_tag_index(db)
+    return index.autocomplete(prefix, limit)
+
+
+@router.get("/popular", response_model=List[schemas.TagUsage])
+async def read_popular_tags(
+    limit: int = Query(10, gt=0, le=100, description="Сколько тегов вернуть"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Самые используемые теги. Читаем готовые счётчики usage_count
+    (их ведут триггеры на таблицах связей) по индексу, без подсчёта связей.
+    """
+    result = await db.execute(
+        select(models.Tag)
+        .order_by(models.Tag.usage_count.desc(), models.Tag.id)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
 @router.get("/{tag_id}", response_model=schemas.TagRead)
 async def read_tag_by_id(
     tag_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     # token: str = Depends(oauth2_scheme),  # 👈 явно используем схему OAuth2 из main
     # user: models.User = Depends(get_current_user),  # 👈 защита через JWT
@@ -59,9 +121,14 @@ async def read_tag_by_id(
     """
     Ищем тег по ID.
     """
-    tag = await db.get(models.Tag, tag_id)
+    tag = await get_tag(db, tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
+
+    etag = make_etag(tag.model_dump())
+    not_modified = not_modified_response(request, response, etag, settings.http_reference_max_age)
+    if not_modified is not None:
+        return not_modified
     return tag
 
 
@@ -94,6 +161,7 @@ async def update_tag(
     tag.name = tag_in.name
     await db.commit()
     await db.refresh(tag)
+    await invalidate("tag", tag_id)
     return tag
 
 
@@ -115,4 +183,102 @@ async def delete_tag(
 
     await db.delete(tag)
     await db.commit()
+    await invalidate("tag", tag_id)
     return {"detail": "Tag deleted"}
+
+
+async def _publish_items_changed(lost_ids, found_ids) -> None:
+    for item_id in lost_ids:
+        await publish_item_changed("lost", item_id)
+    for item_id in found_ids:
+        await publish_item_changed("found", item_id)
+
+
+@router.post("/{tag_id}/attach", response_model=schemas.TagItemsResult)
+async def attach_tag_to_items(
+    tag_id: int,
+    items: schemas.TagItemIds,
+    db: AsyncSession = Depends(get_db),
+    token_data: schemas.TokenData = Depends(get_token_data),
+):
+    """
+    Привязываем тег сразу ко многим LostItem/FoundItem.
+    Для каждой таблицы связей — один INSERT ... SELECT ... ON CONFLICT DO NOTHING:
+    несуществующие предметы отсекает SELECT, уже привязанные — ON CONFLICT.
+    """
+    lost_ids, found_ids = [], []
+    try:
+        if items.lost_item_ids:
+            result = await db.execute(
+                insert(models.lostitem_tag)
+                .from_select(
+                    ["lost_item_id", "tag_id"],
+                    select(models.LostItem.id, literal(tag_id))
+                    .where(models.LostItem.id.in_(items.lost_item_ids)),
+                )
+                .on_conflict_do_nothing()
+                .returning(models.lostitem_tag.c.lost_item_id)
+            )
+            lost_ids = result.scalars().all()
+        if items.found_item_ids:
+            result = await db.execute(
+                insert(models.founditem_tag)
+                .from_select(
+                    ["found_item_id", "tag_id"],
+                    select(models.FoundItem.id, literal(tag_id))
+                    .where(models.FoundItem.id.in_(items.found_item_ids)),
+                )
+                .on_conflict_do_nothing()
+                .returning(models.founditem_tag.c.found_item_id)
+            )
+            found_ids = result.scalars().all()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=404, detail="Tag not found")
+        raise
+
+    # Теги входят в вектор предметов — обновляем индекс FoundItem
+    # и пересчитываем совпадения затронутых предметов
+    await reindex_found_items(db, found_ids)
+    await _publish_items_changed(lost_ids, found_ids)
+    return schemas.TagItemsResult(lost_items=len(lost_ids), found_items=len(found_ids))
+
+
+@router.post("/{tag_id}/detach", response_model=schemas.TagItemsResult)
+async def detach_tag_from_items(
+    tag_id: int,
+    items: schemas.TagItemIds,
+    db: AsyncSession = Depends(get_db),
+    token_data: schemas.TokenData = Depends(get_token_data),
+):
+    """
+    Отвязываем тег от многих LostItem/FoundItem: по одному DELETE на таблицу связей.
+    """
+    lost_ids, found_ids = [], []
+    if items.lost_item_ids:
+        result = await db.execute(
+            delete(models.lostitem_tag)
+            .where(
+                models.lostitem_tag.c.tag_id == tag_id,
+                models.lostitem_tag.c.lost_item_id.in_(items.lost_item_ids),
+            )
+            .returning(models.lostitem_tag.c.lost_item_id)
+        )
+        lost_ids = result.scalars().all()
+    if items.found_item_ids:
+        result = await db.execute(
+            delete(models.founditem_tag)
+            .where(
+                models.founditem_tag.c.tag_id == tag_id,
+                models.founditem_tag.c.found_item_id.in_(items.found_item_ids),
+            )
+            .returning(models.founditem_tag.c.found_item_id)
+        )
+        found_ids = result.scalars().all()
+    await db.commit()
+
+    await reindex_found_items(db, found_ids)
+    await _publish_items_changed(lost_ids, found_ids)
+    return schemas.TagItemsResult(lost_items=len(lost_ids), found_items=len(found_ids))
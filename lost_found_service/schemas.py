@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+from typing import Literal
 
 
 # Модель для данных пользователя в JWT
@@ -31,6 +32,23 @@ class TagUpdate(BaseModel):
     name: str | None = None
 
 
+class TagItemIds(BaseModel):
+    """
+    Предметы для массовой привязки/отвязки тега.
+    """
+    lost_item_ids: list[int] = []
+    found_item_ids: list[int] = []
+
+
+class TagItemsResult(BaseModel):
+    """
+    Сколько связей реально создано/удалено
+    (уже существующие связи и несуществующие предметы не считаются).
+    """
+    lost_items: int
+    found_items: int
+
+
 class TagRead(TagBase):
     """
     Возвращаемый при GET.
@@ -42,6 +60,13 @@ class TagRead(TagBase):
         from_attributes = True
 
 
+class TagUsage(TagRead):
+    """
+    Тег со счётчиком использования (для GET /tags/popular).
+    """
+    usage_count: int
+
+
 # LostItems
 class LostItemBase(BaseModel):
     category_id: int
@@ -100,6 +125,22 @@ class FoundItem(FoundItemBase):
         from_attributes = True
 
 
+class BulkItemResult(BaseModel):
+    """
+    Результат для одной строки bulk-запроса:
+    id созданного предмета или текст ошибки.
+    """
+    index: int
+    id: int | None = None
+    error: str | None = None
+
+
+class BulkCreateResult(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkItemResult]
+
+
 class CategoryCreate(BaseModel):
     name: str
     description: str = ""
@@ -117,3 +158,37 @@ class CategoryRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ItemEvent(BaseModel):
+    """
+    Событие RabbitMQ: LostItem или FoundItem создан/изменён.
+    """
+    kind: Literal["lost", "found"]
+    id: int
+
+
+class CacheEvent(BaseModel):
+    """
+    Сообщение о сбросе кэша категории или тега
+    """
+    kind: Literal["category", "tag"]
+    id: int | None = None
+
+
+class ItemMatch(BaseModel):
+    """
+    Совпадение LostItem с FoundItem, посчитанное в фоне.
+    """
+    found_item: FoundItem
+    score: float
+    computed_at: datetime
+
+
+class ItemMatchPage(BaseModel):
+    """
+    Страница совпадений. next_cursor передаётся в следующий запрос;
+    None — страниц больше нет.
+    """
+    items: list[ItemMatch]
+    next_cursor: str | None = None
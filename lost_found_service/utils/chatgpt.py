@@ -1,19 +1,22 @@
-import os
-import openai
+import asyncio
+import json
 import math
 
+import openai
+from fastapi import HTTPException, Request
 
-# Подключаем API ключ (по-хорошему через os.getenv или другой способ)
-openai.api_key = None
+from config import settings
 
 
-def chatgpt_similarity(lost_text: str, found_text: str) -> float:
+# Подключаем API ключ и адрес API (можно указать локальный/тестовый сервер)
+openai.api_key = settings.openai_api_key
+openai.api_base = settings.openai_api_base
+
+
+def _build_messages(lost_text: str, found_text: str) -> list[dict]:
     """
-    Вызывает OpenAI Chat Completion (gpt-3.5-turbo)
-    и просит вернуть число (0..100), показывающее,
-    насколько LostItem и FoundItem описывают один и тот же предмет.
+    Собираем "prompt" (точнее, это messages для ChatCompletion)
     """
-    # Собираем "prompt" (точнее, это messages для ChatCompletion)
     system_message = {
         "role": "system",
         "content": (
@@ -30,13 +33,13 @@ def chatgpt_similarity(lost_text: str, found_text: str) -> float:
             "Насколько они похожи? Верни число от 0 до 100."
         )
     }
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",  # или "gpt-4", если у вас есть доступ
-        messages=[system_message, user_message],
-        max_tokens=10,  # просим очень короткий ответ
-        temperature=0.0,  # чтобы ChatGPT отвечал более детерминированно
-    )
-    # Парсим ответ
+    return [system_message, user_message]
+
+
+def _parse_score(response) -> float:
+    """
+    Достаёт число 0..100 из ответа ChatCompletion.
+    """
     reply_text = response["choices"][0]["message"]["content"].strip()
 
     # Попробуем извлечь число. Может быть "90", "85.5", "  78% " и т.п.
@@ -50,5 +53,216 @@ def chatgpt_similarity(lost_text: str, found_text: str) -> float:
         score = 0.0
 
     # Ограничим диапазон [0..100]
-    score = max(0.0, min(100.0, score))
-    return score
\ No newline at end of file
+    return max(0.0, min(100.0, score))
+
+
+def chatgpt_similarity(lost_text: str, found_text: str) -> float:
+    """
+    Вызывает OpenAI Chat Completion (gpt-3.5-turbo)
+    и просит вернуть число (0..100), показывающее,
+    насколько LostItem и FoundItem описывают один и тот же предмет.
+
+    Синхронный вызов: внутри async-обработчиков используйте
+    chatgpt_similarity_async / score_pairs, чтобы не блокировать event loop.
+    """
+    response = openai.ChatCompletion.create(
+        model=settings.openai_model,
+        messages=_build_messages(lost_text, found_text),
+        max_tokens=10,  # просим очень короткий ответ
+        temperature=0.0,  # чтобы ChatGPT отвечал более детерминированно
+    )
+    return _parse_score(response)
+
+
+async def chatgpt_similarity_async(
+        lost_text: str,
+        found_text: str,
+        timeout: float | None = None,
+) -> float:
+    """
+    Асинхронная версия chatgpt_similarity.
+    Если ответ не получен за timeout секунд, бросает asyncio.TimeoutError.
+    """
+    response = await asyncio.wait_for(
+        openai.ChatCompletion.acreate(
+            model=settings.openai_model,
+            messages=_build_messages(lost_text, found_text),
+            max_tokens=10,
+            temperature=0.0,
+        ),
+        timeout=timeout or settings.llm_timeout,
+    )
+    return _parse_score(response)
+
+
+async def score_pairs(
+        pairs: list[tuple[str, str]],
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        default: float | None = 0.0,
+        semaphore: asyncio.Semaphore | None = None,
+) -> list[float | None]:
+    """
+    Оценивает пары (lost_text, found_text) параллельно:
+    одновременно выполняется не больше concurrency запросов к ChatGPT.
+    Если передан semaphore, лимит общий с вызывающим кодом.
+    Пара, для которой запрос упал или не уложился в timeout, получает default.
+    Результаты возвращаются в порядке входных пар.
+    """
+    semaphore = semaphore or asyncio.Semaphore(concurrency or settings.llm_concurrency)
+
+    async def score(lost_text: str, found_text: str) -> float:
+        async with semaphore:
+            try:
+                return await chatgpt_similarity_async(lost_text, found_text, timeout)
+            except (asyncio.TimeoutError, openai.error.OpenAIError):
+                return default
+
+    return list(await asyncio.gather(*(score(lost, found) for lost, found in pairs)))
+
+
+def _build_batch_messages(lost_text: str, found_texts: list[str]) -> list[dict]:
+    """
+    Prompt для оценки одного LostItem сразу против нескольких FoundItem.
+    """
+    system_message = {
+        "role": "system",
+        "content": (
+            "Ты – помощник, который оценивает, совпадают ли описания предметов. "
+            "Тебе дают один потерянный предмет и пронумерованный список найденных. "
+            "Возвращай только JSON-массив чисел от 0 до 100 – по одному на каждый "
+            "найденный предмет в том же порядке – без пояснений."
+        )
+    }
+    found_list = "\n\n".join(
+        f"{number}.\n{found_text}" for number, found_text in enumerate(found_texts, start=1)
+    )
+    user_message = {
+        "role": "user",
+        "content": (
+            f"Описание потерянного предмета:\n{lost_text}\n\n"
+            f"Найденные предметы:\n{found_list}\n\n"
+            f"Верни JSON-массив из {len(found_texts)} чисел от 0 до 100."
+        )
+    }
+    return [system_message, user_message]
+
+
+def parse_batch_scores(reply_text: str, expected: int) -> list[float] | None:
+    """
+    Разбирает ответ вида "[90, 12.5, 0]" (в том числе внутри ```json ... ```
+    или с текстом вокруг). Возвращает None, если ответ не удалось разобрать
+    или в нём не ровно expected чисел.
+    """
+    start, end = reply_text.find("["), reply_text.rfind("]")
+    if start == -1 or end < start:
+        return None
+    try:
+        values = json.loads(reply_text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != expected:
+        return None
+
+    scores = []
+    for value in values:
+        if isinstance(value, str):
+            value = value.replace("%", "").strip()
+        if isinstance(value, bool):
+            return None
+        try:
+            score = float(value)
+        except (TypeError, ValueError):
+            return None
+        if math.isnan(score):
+            return None
+        scores.append(max(0.0, min(100.0, score)))
+    return scores
+
+
+async def chatgpt_similarity_batch(
+        lost_text: str,
+        found_texts: list[str],
+        timeout: float | None = None,
+) -> list[float] | None:
+    """
+    Оценивает LostItem против нескольких FoundItem одним запросом к ChatGPT.
+    Возвращает None, если ответ не удалось разобрать.
+    """
+    response = await asyncio.wait_for(
+        openai.ChatCompletion.acreate(
+            model=settings.openai_model,
+            messages=_build_batch_messages(lost_text, found_texts),
+            max_tokens=8 * len(found_texts) + 20,
+            temperature=0.0,
+        ),
+        timeout=timeout or settings.llm_timeout,
+    )
+    reply_text = response["choices"][0]["message"]["content"]
+    return parse_batch_scores(reply_text, len(found_texts))
+
+
+async def score_against(
+        lost_text: str,
+        found_texts: list[str],
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        default: float | None = 0.0,
+) -> list[float | None]:
+    """
+    Оценивает один LostItem против списка FoundItem пачками по batch_size
+    текстов в одном запросе (пачки выполняются параллельно, не больше
+    concurrency одновременно). Если ответ на пачку не разобран,
+    её пары переоцениваются по одной через score_pairs.
+    Пачка, запрос которой упал или не уложился в timeout, получает default.
+    """
+    batch_size = batch_size or settings.llm_batch_size
+    if batch_size <= 1:
+        return await score_pairs(
+            [(lost_text, found_text) for found_text in found_texts],
+            concurrency=concurrency, timeout=timeout, default=default,
+        )
+
+    semaphore = asyncio.Semaphore(concurrency or settings.llm_concurrency)
+
+    async def score_batch(batch: list[str]) -> list[float | None]:
+        async with semaphore:
+            try:
+                scores = await chatgpt_similarity_batch(lost_text, batch, timeout)
+            except (asyncio.TimeoutError, openai.error.OpenAIError):
+                return [default] * len(batch)
+        if scores is None:
+            # Некорректный ответ — переоцениваем пачку по одной паре
+            # (под тем же семафором, чтобы не превысить concurrency)
+            scores = await score_pairs(
+                [(lost_text, found_text) for found_text in batch],
+                timeout=timeout, default=default, semaphore=semaphore,
+            )
+        return scores
+
+    batches = [
+        found_texts[i:i + batch_size] for i in range(0, len(found_texts), batch_size)
+    ]
+    results = await asyncio.gather(*(score_batch(batch) for batch in batches))
+    return [score for batch_scores in results for score in batch_scores]
+
+
+async def cancel_on_disconnect(request: Request, coro, poll_interval: float = 0.5):
+    """
+    Выполняет coro, пока клиент остаётся на связи.
+    Если клиент отключился, задача отменяется (вместе со всеми
+    незавершёнными запросами к ChatGPT) и возвращается 499.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import models
+from config import settings
+from utils.items import HIDDEN_FIELDS, item_columns
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_columns(model) -> list:
+    """Колонки выгрузки — те же поля, что отдаёт API (без HIDDEN_FIELDS)."""
+    return [column for column in item_columns(model) if column.name not in HIDDEN_FIELDS]
+
+
+def export_query(model, category_id: int | None = None):
+    """
+    Все предметы таблицы вместе с тегами: один LEFT JOIN к тегам
+    и json_agg с GROUP BY по предмету, без отдельного запроса на теги.
+    """
+    assoc = models.lostitem_tag if model is models.LostItem else models.founditem_tag
+    item_id = assoc.c.lost_item_id if model is models.LostItem else assoc.c.found_item_id
+    tags = func.coalesce(
+        func.json_agg(
+            aggregate_order_by(
+                func.json_build_object("id", models.Tag.id, "name", models.Tag.name),
+                models.Tag.id,
+            )
+        ).filter(models.Tag.id.is_not(None)),
+        literal_column("'[]'::json"),
+        type_=JSON,
+    ).label("tags")
+
+    query = (
+        select(*export_columns(model), tags)
+        .select_from(model)
+        .outerjoin(assoc, item_id == model.id)
+        .outerjoin(models.Tag, models.Tag.id == assoc.c.tag_id)
+        .group_by(model.id)
+        .order_by(model.id)
+    )
+    if category_id is not None:
+        query = query.where(model.category_id == category_id)
+    return query
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(
+        json.dumps(dict(row), ensure_ascii=False, default=_json_default) + "\n" for row in rows
+    )
+
+
+def _csv_chunk(rows, columns: list[str], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            # Теги в CSV — имена через ";"
+            ";".join(tag["name"] for tag in row["tags"]) if column == "tags"
+            else row[column].isoformat() if isinstance(row[column], datetime)
+            else row[column]
+            for column in columns
+        ])
+    return buffer.getvalue()
+
+
+async def stream_export(
+        engine: AsyncEngine,
+        model,
+        export_format: str,
+        category_id: int | None = None,
+) -> AsyncIterator[str]:
+    """
+    Отдаёт предметы кусками по export_chunk_size строк.
+    Строки читаются серверным курсором (stream + yield_per), поэтому память
+    не зависит от размера таблицы. Соединение открывается внутри генератора:
+    сессия из get_db к началу отправки тела ответа уже закрыта.
+    """
+    query = export_query(model, category_id).execution_options(
+        yield_per=settings.export_chunk_size
+    )
+    columns = [column.name for column in export_columns(model)] + ["tags"]
+
+    async with engine.connect() as conn:
+        result = await conn.stream(query)
+        header = True
+        async for rows in result.mappings().partitions():
+            if export_format == "csv":
+                yield _csv_chunk(rows, columns, header)
+            else:
+                yield _ndjson_chunk(rows)
+            header = False
+        if header and export_format == "csv":
+            # Пустая таблица — только заголовок
+            yield _csv_chunk([], columns, True)
@@ -0,0 +1,50 @@
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """
+    Сильный ETag из версии ресурса: хэш от переданных значений
+    (например, id + updated_at + теги).
+    """
+    payload = json.dumps(parts, default=str, sort_keys=True, ensure_ascii=False)
+    return '"' + hashlib.sha1(payload.encode()).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Совпадает ли etag с заголовком If-None-Match
+    (список через запятую, "*" или слабые W/"..." значения).
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates
+
+
+def cache_headers(etag: str, max_age: int) -> dict[str, str]:
+    """
+    ETag и Cache-Control, понятные nginx/браузеру.
+    max_age=0 — ответ можно хранить, но перед использованием нужно
+    перепроверять условным запросом.
+    """
+    cache_control = f"public, max-age={max_age}" if max_age else "no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified_response(request: Request, response: Response, etag: str, max_age: int) -> Response | None:
+    """
+    Возвращает готовый ответ 304, если у клиента актуальная версия,
+    иначе выставляет ETag/Cache-Control на response и возвращает None —
+    обработчик сериализует ресурс как обычно.
+    """
+    headers = cache_headers(etag, max_age)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,215 @@
+import json
+
+import orjson
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import func, insert, literal_column, select
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+from config import settings
+from utils.reference_cache import existing_category_ids
+
+
+# SQLSTATE нарушения внешнего ключа (foreign_key_violation)
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def item_columns(model) -> list:
+    """
+    Колонки таблицы предмета, которые отдаются в API
+    (без вычисляемых, например search_vector).
+    """
+    return [column for column in model.__table__.columns if column.computed is None]
+
+
+# Что можно встроить в ответ списка через include=
+ITEM_INCLUDES = {"tags"}
+
+# Поля, которые не отдаются в API (служебная версия строки для ETag
+# и отметка фонового пересчёта совпадений)
+HIDDEN_FIELDS = {"updated_at", "matches_computed_at"}
+
+
+def sparse_columns(model, fields: str | None, include: str | None, required: tuple = ()) -> list:
+    """
+    Список колонок SELECT для fields=id,name,... и include=tags.
+    id выбирается всегда, required — колонки, нужные для пагинации.
+    Теги подтягиваются подзапросом tags_json в том же SELECT.
+    Неизвестное поле — ошибка 400.
+    """
+    available = {
+        column.name: column for column in item_columns(model) if column.name not in HIDDEN_FIELDS
+    }
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    includes = {name.strip() for name in include.split(",") if name.strip()} if include else set()
+    unknown = includes - ITEM_INCLUDES
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+
+    selected = ["id", *names, *required]
+    columns = [available[name] for name in dict.fromkeys(selected)]
+    if "tags" in includes:
+        columns.append(tags_json(model))
+    return columns
+
+
+def sparse_response(rows, headers: dict | None = None) -> Response:
+    """
+    Быстрый путь для fields=/include=: строки уже содержат только выбранные
+    поля, поэтому без response_model и jsonable_encoder — словари из
+    row._mapping сразу кодируются orjson (datetime он кодирует сам).
+    include=tags без fields даёт тот же объект, что и обычный список.
+    """
+    content = orjson.dumps([dict(row._mapping) for row in rows])
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def tags_json(model):
+    """
+    Скалярный подзапрос: теги предмета JSON-массивом [{"id": ..., "name": ...}].
+    Коррелирует с таблицей model, поэтому годится и для SELECT,
+    и для RETURNING в INSERT/UPDATE — теги приходят в том же запросе.
+    """
+    assoc = models.lostitem_tag if model is models.LostItem else models.founditem_tag
+    item_id = assoc.c.lost_item_id if model is models.LostItem else assoc.c.found_item_id
+    return (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object("id", models.Tag.id, "name", models.Tag.name),
+                        models.Tag.id,
+                    )
+                ),
+                literal_column("'[]'::json"),
+                type_=JSON,
+            )
+        )
+        .select_from(assoc.join(models.Tag, models.Tag.id == assoc.c.tag_id))
+        .where(item_id == model.id)
+        .scalar_subquery()
+        .label("tags")
+    )
+
+
+def is_foreign_key_violation(exc: IntegrityError) -> bool:
+    """True, если IntegrityError вызван нарушением внешнего ключа."""
+    return getattr(exc.orig, "sqlstate", None) == FOREIGN_KEY_VIOLATION
+
+
+async def read_bulk_body(request: Request) -> list:
+    """
+    Читает тело bulk-запроса: JSON-массив или NDJSON
+    (Content-Type: application/x-ndjson, по объекту на строку).
+    Строка NDJSON, которую не удалось разобрать, возвращается как есть
+    и получает ошибку при валидации.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        try:
+            text = body.decode()
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        rows = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(line)
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+
+    if len(rows) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413, detail=f"Too many items (max {settings.bulk_max_items})"
+        )
+    return rows
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def _insert_values(model, item: BaseModel) -> dict:
+    """
+    Значения для строки multi-row INSERT. Во всех строках должен быть
+    одинаковый набор колонок, поэтому пропущенные поля заменяются
+    default колонки (в том числе SQL-выражением, например now()).
+    """
+    values = item.model_dump()
+    for key, value in values.items():
+        column = model.__table__.columns[key]
+        if value is None and column.default is not None:
+            values[key] = column.default.arg
+    return values
+
+
+async def bulk_create_items(
+        db: AsyncSession,
+        model,
+        create_schema: type[BaseModel],
+        rows: list,
+) -> tuple[list[schemas.BulkItemResult], list[dict]]:
+    """
+    Создаёт предметы пачкой: каждая строка валидируется отдельно,
+    категории проверяются одним запросом, валидные строки вставляются
+    одним multi-row INSERT ... RETURNING в одной транзакции.
+    Возвращает результаты по строкам (в порядке входа) и созданные строки.
+    """
+    results = [schemas.BulkItemResult(index=index) for index in range(len(rows))]
+    valid: list[tuple[int, BaseModel]] = []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, create_schema.model_validate(row)))
+        except ValidationError as e:
+            results[index].error = _validation_message(e)
+
+    category_ids = {item.category_id for _, item in valid}
+    if category_ids:
+        existing = await existing_category_ids(db, category_ids)
+        for index, item in valid:
+            if item.category_id not in existing:
+                results[index].error = "Category not found"
+        valid = [(index, item) for index, item in valid if item.category_id in existing]
+
+    if not valid:
+        return results, []
+
+    try:
+        # PostgreSQL возвращает строки RETURNING в порядке VALUES
+        result = await db.execute(
+            insert(model)
+            .values([_insert_values(model, item) for _, item in valid])
+            .returning(*item_columns(model))
+        )
+        created = [dict(row) for row in result.mappings().all()]
+        await db.commit()
+    except IntegrityError as e:
+        # Категорию удалили между проверкой и вставкой
+        await db.rollback()
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=409, detail="Category was deleted, retry the request")
+        raise
+
+    for (index, _), row in zip(valid, created):
+        results[index].id = row["id"]
+    return results, created
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+import models
+from config import settings
+from utils.similarity import (
+    VectorIndex, found_candidates_query, get_found_index, vectorize_item
+)
+
+
+async def _save_matches(db: AsyncSession, rows: list[dict]) -> None:
+    if rows:
+        await db.execute(
+            insert(models.ItemMatch)
+            .values(rows)
+            .on_conflict_do_update(
+                index_elements=["lost_item_id", "found_item_id"],
+                set_={"score": insert(models.ItemMatch).excluded.score,
+                      "computed_at": insert(models.ItemMatch).excluded.computed_at},
+            )
+        )
+
+
+async def _trim_matches(db: AsyncSession, lost_item_ids) -> None:
+    """
+    Оставляет у каждого из lost_item_ids только match_top_n лучших совпадений,
+    как после match_lost_item: находка не должна раздувать чужой список.
+    """
+    if not lost_item_ids:
+        return
+    ranked = (
+        select(
+            models.ItemMatch.lost_item_id,
+            models.ItemMatch.found_item_id,
+            func.row_number().over(
+                partition_by=models.ItemMatch.lost_item_id,
+                order_by=(models.ItemMatch.score.desc(), models.ItemMatch.found_item_id),
+            ).label("position"),
+        )
+        .where(models.ItemMatch.lost_item_id.in_(lost_item_ids))
+        .subquery()
+    )
+    await db.execute(
+        delete(models.ItemMatch).where(
+            tuple_(models.ItemMatch.lost_item_id, models.ItemMatch.found_item_id).in_(
+                select(ranked.c.lost_item_id, ranked.c.found_item_id)
+                .where(ranked.c.position > settings.match_top_n)
+            )
+        )
+    )
+
+
+async def match_lost_item(db: AsyncSession, lost_item_id: int) -> None:
+    """
+    Пересчитывает совпадения LostItem: кандидаты FoundItem отбираются
+    теми же фильтрами, что и в similar_found_items (категория + окно по дате),
+    и оцениваются по индексу FoundItem. Сохраняются match_top_n лучших
+    с оценкой не ниже match_min_score, время пересчёта — в matches_computed_at.
+    """
+    result = await db.execute(
+        select(models.LostItem)
+        .options(selectinload(models.LostItem.tags))
+        .where(models.LostItem.id == lost_item_id)
+    )
+    lost_item = result.scalar_one_or_none()
+    if lost_item is None:
+        return
+
+    candidate_ids = (await db.execute(
+        found_candidates_query(
+            lost_item,
+            category_id=lost_item.category_id,
+            days_before=settings.match_days_before,
+        )
+    )).scalars().all()
+
+    index = await get_found_index(db)
+    candidates = index.search(vectorize_item(lost_item), settings.match_top_n, candidate_ids)
+
+    await db.execute(
+        delete(models.ItemMatch).where(models.ItemMatch.lost_item_id == lost_item_id)
+    )
+    await _save_matches(db, [
+        {"lost_item_id": lost_item_id, "found_item_id": found_item_id, "score": round(score * 100, 2)}
+        for found_item_id, score in candidates
+        if score * 100 >= settings.match_min_score
+    ])
+    # Отметка о пересчёте: пустой item_matches значит «совпадений нет», а не
+    # «ещё не считали». updated_at не трогаем — ETag предмета не меняется
+    await db.execute(
+        update(models.LostItem)
+        .where(models.LostItem.id == lost_item_id)
+        .values(matches_computed_at=func.now(), updated_at=models.LostItem.updated_at)
+    )
+    await db.commit()
+
+
+async def match_found_item(db: AsyncSession, found_item_id: int) -> None:
+    """
+    Пересчитывает совпадения FoundItem со всеми подходящими LostItem
+    (та же категория, потеря не позже чем за match_days_before дней
+    до находки) и сохраняет пары с оценкой не ниже match_min_score;
+    у каждого LostItem остаётся не больше match_top_n лучших совпадений.
+    """
+    result = await db.execute(
+        select(models.FoundItem)
+        .options(selectinload(models.FoundItem.tags))
+        .where(models.FoundItem.id == found_item_id)
+    )
+    found_item = result.scalar_one_or_none()
+    if found_item is None:
+        return
+
+    lost_query = (
+        select(models.LostItem)
+        .options(selectinload(models.LostItem.tags))
+        .where(models.LostItem.category_id == found_item.category_id)
+    )
+    if found_item.found_date is not None:
+        lost_query = lost_query.where(
+            models.LostItem.lost_date <= found_item.found_date + timedelta(days=settings.match_days_before)
+        )
+    lost_items = (await db.execute(lost_query)).scalars().all()
+
+    # LostItem-кандидатов немного (одна категория и окно по дате),
+    # поэтому их векторы строятся на лету
+    lost_index = VectorIndex.build(lost_items)
+    scores = lost_index.search(vectorize_item(found_item), len(lost_index))
+
+    await db.execute(
+        delete(models.ItemMatch).where(models.ItemMatch.found_item_id == found_item_id)
+    )
+    rows = [
+        {"lost_item_id": lost_item_id, "found_item_id": found_item_id, "score": round(score * 100, 2)}
+        for lost_item_id, score in scores
+        if score * 100 >= settings.match_min_score
+    ]
+    await _save_matches(db, rows)
+    await _trim_matches(db, [row["lost_item_id"] for row in rows])
+    await db.commit()
@@ -0,0 +1,86 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def encode_cursor(*values) -> str:
+    """
+    Кодирует значения ключа сортировки последней строки страницы
+    в непрозрачный токен (base64url от JSON).
+    """
+    payload = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list:
+    """
+    Раскодирует токен encode_cursor. Испорченный токен — ошибка 400.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def sort_column(model, order_by: str | None):
+    """
+    Колонка сортировки для пагинации по курсору.
+    Допускаются только обычные колонки таблицы (не связи и не вычисляемые).
+    """
+    name = order_by or "id"
+    if name not in model.__table__.columns or model.__table__.c[name].computed is not None:
+        raise HTTPException(status_code=400, detail=f"Cannot paginate by '{name}'")
+    return getattr(model, name)
+
+
+def _cursor_value(column, value):
+    """Приводит значение из курсора к типу колонки."""
+    try:
+        if column.type.python_type is datetime:
+            return datetime.fromisoformat(value)
+        return column.type.python_type(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_paginate(query, column, id_column, sort_desc: bool, cursor: str | None, limit: int):
+    """
+    Keyset-пагинация: вместо OFFSET добавляет условие "строго после
+    последней строки предыдущей страницы" по ключу (column, id).
+    Глубокие страницы стоят столько же, сколько первая, а вставки между
+    запросами не приводят к дублям и пропускам.
+    Запрашивается limit + 1 строка — лишняя показывает, что есть следующая страница.
+    """
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, 2)
+        last_value = _cursor_value(column, last_value)
+        last_id = _cursor_value(id_column, last_id)
+        if sort_desc:
+            query = query.where(tuple_(column, id_column) < tuple_(last_value, last_id))
+        else:
+            query = query.where(tuple_(column, id_column) > tuple_(last_value, last_id))
+
+    if sort_desc:
+        query = query.order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(column.asc(), id_column.asc())
+    return query.limit(limit + 1)
+
+
+def split_page(rows: list, limit: int, column_name: str) -> tuple[list, str | None]:
+    """
+    Отрезает лишнюю строку, запрошенную keyset_paginate, и возвращает
+    (строки страницы, курсор следующей страницы или None).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, column_name), last.id)
@@ -0,0 +1,88 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+from broker import publish_cache_invalidation
+from config import settings
+from utils.cache import TTLCache
+from utils.tag_index import TagIndex
+
+
+# Категории и теги меняются редко: держим их в памяти процесса.
+# Изменения в одном воркере рассылаются остальным через fanout RabbitMQ.
+categories_cache = TTLCache(settings.reference_cache_size, settings.reference_cache_ttl)
+tags_cache = TTLCache(settings.reference_cache_size, settings.reference_cache_ttl)
+
+# Ключ TagIndex со всеми тегами в tags_cache (id тегов — целые числа)
+ALL_TAGS = "all"
+
+
+async def get_category(db: AsyncSession, category_id: int) -> schemas.CategoryRead | None:
+    category = categories_cache.get(category_id)
+    if category is None:
+        db_category = await db.get(models.Category, category_id)
+        if db_category is None:
+            return None
+        category = schemas.CategoryRead.model_validate(db_category)
+        categories_cache.set(category_id, category)
+    return category
+
+
+async def existing_category_ids(db: AsyncSession, category_ids) -> set[int]:
+    """
+    Какие из category_ids существуют. В базу уходит один запрос
+    только за теми id, которых нет в кэше.
+    """
+    existing = {category_id for category_id in category_ids if categories_cache.get(category_id)}
+    missing = set(category_ids) - existing
+    if missing:
+        result = await db.execute(
+            select(models.Category).where(models.Category.id.in_(missing))
+        )
+        for db_category in result.scalars().all():
+            categories_cache.set(db_category.id, schemas.CategoryRead.model_validate(db_category))
+            existing.add(db_category.id)
+    return existing
+
+
+async def get_tag(db: AsyncSession, tag_id: int) -> schemas.TagRead | None:
+    tag = tags_cache.get(tag_id)
+    if tag is None:
+        db_tag = await db.get(models.Tag, tag_id)
+        if db_tag is None:
+            return None
+        tag = schemas.TagRead.model_validate(db_tag)
+        tags_cache.set(tag_id, tag)
+    return tag
+
+
+async def get_tag_index(db: AsyncSession) -> TagIndex:
+    """
+    Все теги, отсортированные для пагинации и автодополнения.
+    Строится одним запросом и живёт в кэше до изменения тегов или TTL.
+    """
+    index = tags_cache.get(ALL_TAGS)
+    if index is None:
+        result = await db.execute(select(models.Tag))
+        index = TagIndex([schemas.TagRead.model_validate(tag) for tag in result.scalars().all()])
+        tags_cache.set(ALL_TAGS, index)
+    return index
+
+
+def drop_cached(kind: str, item_id: int | None = None) -> None:
+    """
+    Сбрасывает запись кэша в этом процессе.
+    kind="category" или "tag"; изменение любого тега сбрасывает и список тегов.
+    """
+    if kind == "category":
+        categories_cache.pop(item_id)
+    elif kind == "tag":
+        tags_cache.pop(item_id)
+        tags_cache.pop(ALL_TAGS)
+
+
+async def invalidate(kind: str, item_id: int | None = None) -> None:
+    """Сбрасывает запись кэша здесь и во всех остальных воркерах."""
+    drop_cached(kind, item_id)
+    await publish_cache_invalidation(kind, item_id)
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from config import settings
+from utils.cache import LRUCache
+from utils.chatgpt import score_against
+
+
+# Первый уровень кэша — память процесса
+_memory_cache = LRUCache(settings.score_cache_size)
+
+
+def score_key(lost_text: str, found_text: str) -> str:
+    """
+    Ключ оценки: sha256 от модели и обоих текстов.
+    Любое изменение предмета (название, описание, категория, теги)
+    меняет его текст, а значит и ключ.
+    """
+    payload = "\x00".join((settings.openai_model, lost_text, found_text))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def cached_score_pairs(
+        db: AsyncSession,
+        pairs: list[tuple[str, str]],
+) -> list[float]:
+    """
+    То же, что score_pairs, но с двухуровневым кэшем:
+    1) LRU в памяти процесса;
+    2) таблица similarity_scores в Postgres (один SELECT на все промахи).
+    В ChatGPT уходят только пары, которых нет ни в одном уровне
+    (пачками, см. score_against).
+    Неудачные запросы (таймаут, ошибка API) не кэшируются.
+    """
+    keys = [score_key(lost_text, found_text) for lost_text, found_text in pairs]
+    scores: dict[str, float] = {}
+
+    for key in keys:
+        score = _memory_cache.get(key)
+        if score is not None:
+            scores[key] = score
+
+    missing = [key for key in dict.fromkeys(keys) if key not in scores]
+    if missing:
+        result = await db.execute(
+            select(models.SimilarityScore.key, models.SimilarityScore.score)
+            .where(models.SimilarityScore.key.in_(missing))
+        )
+        for key, score in result.all():
+            scores[key] = score
+            _memory_cache.set(key, score)
+
+    # Промахи группируем по LostItem: каждая группа оценивается пачками
+    to_score: dict[str, dict[str, str]] = {}
+    for key, (lost_text, found_text) in zip(keys, pairs):
+        if key not in scores:
+            to_score.setdefault(lost_text, {}).setdefault(key, found_text)
+    if to_score:
+        group_scores = await asyncio.gather(*(
+            score_against(lost_text, list(group.values()), default=None)
+            for lost_text, group in to_score.items()
+        ))
+        new_scores = [
+            (key, score)
+            for group, batch_scores in zip(to_score.values(), group_scores)
+            for key, score in zip(group, batch_scores)
+        ]
+        rows = []
+        for key, score in new_scores:
+            if score is None:
+                continue
+            scores[key] = score
+            _memory_cache.set(key, score)
+            rows.append({"key": key, "score": score})
+        if rows:
+            await db.execute(
+                insert(models.SimilarityScore).values(rows).on_conflict_do_nothing()
+            )
+            await db.commit()
+
+    return [scores.get(key, 0.0) for key in keys]
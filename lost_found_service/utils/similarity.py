@@ -0,0 +1,427 @@
+import asyncio
+import fcntl
+import os
+import re
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+import models
+from config import settings
+
+
+# Размерность хешированного пространства признаков.
+# 1024 float32 = 4 КБ на предмет: десятки тысяч строк помещаются в память.
+N_FEATURES = 1024
+
+# Веса разных групп признаков
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+CATEGORY_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(text: str | None) -> list[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _char_ngrams(word: str, n: int = 3) -> list[str]:
+    """
+    Символьные n-граммы слова (с границами слова).
+    Позволяют сопоставлять разные формы слова: "паспорт" / "паспорта".
+    """
+    padded = f" {word} "
+    if len(padded) <= n:
+        return [padded]
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+def _terms(text: str | None) -> list[str]:
+    terms = []
+    for word in _words(text):
+        terms.append(f"w:{word}")
+        terms.extend(f"g:{gram}" for gram in _char_ngrams(word))
+    return terms
+
+
+def _add_terms(vector: np.ndarray, terms: list[str], weight: float) -> None:
+    """
+    "Hashing trick": каждый признак попадает в ячейку crc32(term) % N_FEATURES
+    со знаком, взятым из старшего бита хеша (снижает влияние коллизий).
+    crc32 детерминирован между процессами, в отличие от встроенного hash().
+    """
+    for term in terms:
+        h = zlib.crc32(term.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vector[h % N_FEATURES] += sign * weight
+
+
+def item_vector(
+        name: str | None,
+        description: str | None,
+        category_id: int | None,
+        tag_ids: list[int],
+) -> np.ndarray:
+    """
+    Строит нормированный (L2) вектор признаков предмета по названию,
+    описанию, категории и тегам. Скалярное произведение двух таких
+    векторов — косинусная близость предметов.
+    """
+    vector = np.zeros(N_FEATURES, dtype=np.float32)
+    _add_terms(vector, _terms(name), NAME_WEIGHT)
+    _add_terms(vector, _terms(description), DESCRIPTION_WEIGHT)
+    if category_id is not None:
+        _add_terms(vector, [f"category:{category_id}"], CATEGORY_WEIGHT)
+    _add_terms(vector, [f"tag:{tag_id}" for tag_id in tag_ids], TAG_WEIGHT)
+
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def vectorize_item(item) -> np.ndarray:
+    """Вектор для ORM-объекта LostItem/FoundItem (tags должны быть загружены)."""
+    return item_vector(
+        item.name,
+        item.description,
+        item.category_id,
+        [tag.id for tag in item.tags],
+    )
+
+
+def render_item_text(item) -> str:
+    """
+    Текстовое описание предмета для ChatGPT
+    (tags и category должны быть загружены).
+    """
+    parts = [
+        f"Название: {item.name}",
+        f"Описание: {item.description or ''}"
+    ]
+    if item.category:
+        parts.append(f"Категория: {item.category.name}")
+    if item.tags:
+        tag_names = ", ".join(tag.name for tag in item.tags)
+        parts.append(f"Теги: {tag_names}")
+    return "\n".join(parts)
+
+
+class VectorIndex:
+    """
+    Матрица векторов предметов (по строке на предмет) и их id.
+    Поиск похожих — одно матричное умножение и частичная сортировка.
+
+    Если задан path, матрица и id хранятся в memory-mapped файлах
+    (<path>.ids.npy, <path>.vectors.npy): изменения одной строки сразу
+    попадают на диск, а перезапущенный процесс открывает индекс за
+    миллисекунды, не перечитывая таблицу. Строки хранятся плотно:
+    при удалении на место удалённой строки переносится последняя.
+
+    Индекс рассчитан на один процесс: файлы захватывает lock() (flock на
+    <path>.lock), и второй процесс с тем же path получает ошибку, а не
+    молча перезаписывает чужие строки.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.count = 0
+        self._rows: dict[int, int] = {}  # id предмета -> номер строки
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._matrix = np.zeros((0, N_FEATURES), dtype=np.float32)
+        self._lock_file = None
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self.count]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:self.count]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._rows
+
+    # -------------------------------------------------------------------------
+    # Хранилище
+    # -------------------------------------------------------------------------
+    def lock(self) -> None:
+        """
+        Захватывает файлы индекса для этого процесса (до его завершения).
+        Если их уже держит другой процесс — RuntimeError.
+        """
+        if self.path is None or self._lock_file is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Vector index {self.path} is used by another process: "
+                "lost_found_service must run with a single worker"
+            )
+        self._lock_file = lock_file
+
+    def _files(self) -> tuple[str, str]:
+        return f"{self.path}.ids.npy", f"{self.path}.vectors.npy"
+
+    def _allocate(self, capacity: int) -> None:
+        """Выделяет хранилище на capacity строк, копируя текущие строки."""
+        if self.path is None:
+            ids = np.zeros(capacity, dtype=np.int64)
+            matrix = np.zeros((capacity, N_FEATURES), dtype=np.float32)
+            ids[:self.count] = self.ids
+            matrix[:self.count] = self.matrix
+            self._ids, self._matrix = ids, matrix
+            return
+
+        # Пишем во временные файлы и атомарно подменяем старые
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        new_arrays = []
+        for file_name, shape, dtype, old in (
+            (self._files()[0], (capacity,), np.int64, self.ids),
+            (self._files()[1], (capacity, N_FEATURES), np.float32, self.matrix),
+        ):
+            tmp_name = file_name + ".tmp"
+            array = np.lib.format.open_memmap(tmp_name, mode="w+", dtype=dtype, shape=shape)
+            array[:self.count] = old
+            array.flush()
+            new_arrays.append((tmp_name, file_name))
+        for tmp_name, file_name in new_arrays:
+            os.replace(tmp_name, file_name)
+        self._open()
+
+    def _open(self) -> None:
+        ids_file, vectors_file = self._files()
+        self._ids = np.lib.format.open_memmap(ids_file, mode="r+")
+        self._matrix = np.lib.format.open_memmap(vectors_file, mode="r+")
+
+    def _flush(self) -> None:
+        if isinstance(self._ids, np.memmap):
+            self._ids.flush()
+            self._matrix.flush()
+
+    def load(self) -> bool:
+        """
+        Открывает сохранённый индекс. Возвращает False, если файлов нет
+        или они не совместимы (например, сменилась размерность признаков).
+        """
+        if self.path is None or not all(os.path.exists(f) for f in self._files()):
+            return False
+        try:
+            self._open()
+        except (OSError, ValueError):
+            return False
+        if self._matrix.ndim != 2 or self._matrix.shape[1] != N_FEATURES:
+            return False
+
+        # Валидные id (> 0) всегда лежат плотно в начале массива
+        self.count = int(np.count_nonzero(self._ids))
+        self._rows = {int(item_id): row for row, item_id in enumerate(self.ids)}
+        return True
+
+    def rebuild(self, items) -> None:
+        """Полностью пересобирает индекс по списку предметов."""
+        items = list(items)
+        self.count = 0
+        self._rows = {}
+        self._allocate(max(self.INITIAL_CAPACITY, len(items)))
+        for row, item in enumerate(items):
+            self._ids[row] = item.id
+            self._matrix[row] = vectorize_item(item)
+            self._rows[item.id] = row
+        self.count = len(items)
+        self._flush()
+
+    @classmethod
+    def build(cls, items, path: str | None = None) -> "VectorIndex":
+        index = cls(path)
+        index.rebuild(items)
+        return index
+
+    # -------------------------------------------------------------------------
+    # Инкрементальные изменения
+    # -------------------------------------------------------------------------
+    def upsert(self, item_id: int, vector: np.ndarray) -> None:
+        """Добавляет или обновляет строку одного предмета."""
+        row = self._rows.get(item_id)
+        if row is None:
+            if self.count == len(self._ids):
+                self._allocate(max(self.INITIAL_CAPACITY, 2 * len(self._ids)))
+            row = self.count
+            self._ids[row] = item_id
+            self._rows[item_id] = row
+            self.count += 1
+        self._matrix[row] = vector
+        self._flush()
+
+    def remove(self, item_id: int) -> None:
+        """Удаляет строку предмета (на её место переносится последняя)."""
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        last = self.count - 1
+        if row != last:
+            moved_id = int(self._ids[last])
+            self._ids[row] = moved_id
+            self._matrix[row] = self._matrix[last]
+            self._rows[moved_id] = row
+        self._ids[last] = 0
+        self.count = last
+        self._flush()
+
+    # -------------------------------------------------------------------------
+    # Поиск
+    # -------------------------------------------------------------------------
+    def search(
+            self,
+            vector: np.ndarray,
+            top_k: int,
+            candidate_ids=None,
+    ) -> list[tuple[int, float]]:
+        """
+        Возвращает до top_k пар (id, близость 0..1), отсортированных по убыванию.
+        Если передан candidate_ids, оцениваются только строки этих предметов.
+        """
+        if candidate_ids is None:
+            rows = np.arange(self.count)
+        else:
+            rows = np.array(
+                [self._rows[item_id] for item_id in candidate_ids if item_id in self._rows],
+                dtype=np.int64,
+            )
+        if len(rows) == 0 or top_k <= 0:
+            return []
+
+        scores = self._matrix[rows] @ vector
+        if top_k < len(scores):
+            # argpartition — O(n), полная сортировка нужна только для top_k
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [
+            (int(self._ids[rows[i]]), float(max(0.0, scores[i])))
+            for i in top
+        ]
+
+
+def found_candidates_query(
+        lost_item,
+        category_id: int | None = None,
+        days_before: int | None = None,
+        shared_tags: bool = False,
+):
+    """
+    SELECT id кандидатов FoundItem для LostItem (tags должны быть загружены):
+    - category_id: только найденные в этой категории;
+    - days_before: только найденные не раньше, чем за N дней до потери;
+    - shared_tags: только имеющие хотя бы один общий тег с LostItem.
+    Возвращает None, если ни один фильтр не задан (кандидаты — все FoundItem).
+    Фильтры опираются на индексы ix_found_items_category_id_found_date
+    и ix_founditem_tag_tag_id.
+    """
+    query = select(models.FoundItem.id)
+    filtered = False
+
+    if category_id is not None:
+        query = query.where(models.FoundItem.category_id == category_id)
+        filtered = True
+
+    if days_before is not None and lost_item.lost_date is not None:
+        query = query.where(
+            models.FoundItem.found_date >= lost_item.lost_date - timedelta(days=days_before)
+        )
+        filtered = True
+
+    if shared_tags and lost_item.tags:
+        query = query.where(
+            models.FoundItem.id.in_(
+                select(models.founditem_tag.c.found_item_id)
+                .where(models.founditem_tag.c.tag_id.in_([tag.id for tag in lost_item.tags]))
+            )
+        )
+        filtered = True
+
+    return query if filtered else None
+
+
+# -----------------------------------------------------------------------------
+# Индекс найденных предметов (FoundItem) этого процесса
+# -----------------------------------------------------------------------------
+found_index = VectorIndex(settings.found_index_path)
+_found_index_lock = asyncio.Lock()
+_found_index_ready = False
+
+
+async def get_found_index(db: AsyncSession) -> VectorIndex:
+    """
+    Возвращает индекс FoundItem, при первом обращении открывая его с диска.
+    Если файлов нет или число/максимальный id строк не совпадают с таблицей
+    (процесс упал между коммитом и записью в индекс), индекс пересобирается.
+    """
+    global _found_index_ready
+    if _found_index_ready:
+        return found_index
+
+    async with _found_index_lock:
+        if _found_index_ready:
+            return found_index
+
+        result = await db.execute(
+            select(func.count(models.FoundItem.id), func.max(models.FoundItem.id))
+        )
+        db_count, db_max_id = result.one()
+        # Второй воркер с тем же индексом упадёт здесь, а не будет
+        # искать по строкам, которые перезаписывает другой процесс
+        found_index.lock()
+        loaded = found_index.load()
+        index_max_id = int(found_index.ids.max()) if loaded and len(found_index) else None
+        if not loaded or len(found_index) != db_count or index_max_id != db_max_id:
+            items = await db.execute(
+                select(models.FoundItem).options(selectinload(models.FoundItem.tags))
+            )
+            found_index.rebuild(items.scalars().all())
+
+        _found_index_ready = True
+    return found_index
+
+
+async def index_found_item(db: AsyncSession, item) -> None:
+    """Обновляет строку FoundItem в индексе (tags должны быть загружены)."""
+    index = await get_found_index(db)
+    index.upsert(item.id, vectorize_item(item))
+
+
+async def reindex_found_items(db: AsyncSession, item_ids) -> None:
+    """Перечитывает FoundItem с тегами одним запросом и обновляет их в индексе."""
+    if not item_ids:
+        return
+    index = await get_found_index(db)
+    result = await db.execute(
+        select(models.FoundItem)
+        .where(models.FoundItem.id.in_(item_ids))
+        .options(selectinload(models.FoundItem.tags))
+    )
+    for item in result.scalars().all():
+        index.upsert(item.id, vectorize_item(item))
+
+
+async def unindex_found_item(db: AsyncSession, item_id: int) -> None:
+    """Удаляет FoundItem из индекса."""
+    index = await get_found_index(db)
+    index.remove(item_id)
@@ -0,0 +1,48 @@
+from bisect import bisect_left, bisect_right
+
+import schemas
+from utils.http_cache import make_etag
+
+
+class TagIndex:
+    """
+    Все теги в памяти процесса в двух отсортированных массивах:
+    по id — для постраничной выдачи, по имени (casefold) — для
+    автодополнения по префиксу бинарным поиском.
+    Объект неизменяемый: при изменении тегов строится заново.
+    """
+
+    def __init__(self, tags: list[schemas.TagRead]):
+        self.tags = sorted(tags, key=lambda tag: tag.id)
+        self._ids = [tag.id for tag in self.tags]
+        self._by_name = sorted(tags, key=lambda tag: (tag.name.casefold(), tag.id))
+        self._names = [tag.name.casefold() for tag in self._by_name]
+        # ETag всего списка: страница однозначно определяется им и параметрами
+        self.etag = make_etag([tag.model_dump() for tag in self.tags])
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def page(self, after_id: int | None, limit: int) -> tuple[list[schemas.TagRead], int | None]:
+        """
+        Теги с id > after_id, не больше limit.
+        Второе значение — id последнего тега, если есть следующая страница.
+        """
+        start = 0 if after_id is None else bisect_right(self._ids, after_id)
+        page = self.tags[start:start + limit]
+        has_more = start + limit < len(self.tags)
+        return page, (page[-1].id if has_more and page else None)
+
+    def autocomplete(self, prefix: str, limit: int) -> list[schemas.TagRead]:
+        """
+        Первые limit тегов (по алфавиту), имя которых начинается с prefix,
+        без учёта регистра. O(log n + limit).
+        """
+        prefix = prefix.casefold()
+        start = bisect_left(self._names, prefix)
+        result = []
+        for index in range(start, min(start + limit, len(self._names))):
+            if not self._names[index].startswith(prefix):
+                break
+            result.append(self._by_name[index])
+        return result
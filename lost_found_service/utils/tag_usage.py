@@ -0,0 +1,53 @@
+"""
+Сверка счётчиков tags.usage_count с таблицами связей.
+
+Счётчики ведут триггеры, но после ручных правок в базе, восстановления
+из бэкапа и т.п. они могут разойтись. Запуск (из lost_found_service):
+
+    python -m utils.tag_usage
+"""
+import asyncio
+
+from sqlalchemy import func, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from database import AsyncSessionLocal
+
+
+async def reconcile_tag_usage(db: AsyncSession) -> int:
+    """
+    Пересчитывает usage_count всех тегов одним UPDATE: по одному проходу
+    по каждой таблице связей. Меняются только разошедшиеся строки.
+    Возвращает число исправленных тегов.
+    """
+    links = union_all(
+        select(models.lostitem_tag.c.tag_id),
+        select(models.founditem_tag.c.tag_id),
+    ).subquery()
+    # Фактическое число связей для каждого тега (0 — если связей нет)
+    counts = (
+        select(models.Tag.id, func.count(links.c.tag_id).label("cnt"))
+        .outerjoin(links, links.c.tag_id == models.Tag.id)
+        .group_by(models.Tag.id)
+        .subquery()
+    )
+    result = await db.execute(
+        update(models.Tag)
+        .where(models.Tag.id == counts.c.id, models.Tag.usage_count != counts.c.cnt)
+        .values(usage_count=counts.c.cnt)
+        .returning(models.Tag.id)
+    )
+    fixed = len(result.scalars().all())
+    await db.commit()
+    return fixed
+
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        fixed = await reconcile_tag_usage(db)
+    print(f"Tag usage counts fixed: {fixed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+import time
+
+from utils.cache import LRUCache, TTLCache
+from utils.reference_cache import ALL_TAGS, drop_cached, tags_cache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_drop_cached_tag_also_drops_tag_list():
+    tags_cache.set(1, "tag")
+    tags_cache.set(ALL_TAGS, ["tag"])
+
+    drop_cached("tag", 1)
+
+    assert tags_cache.get(1) is None
+    assert tags_cache.get(ALL_TAGS) is None
@@ -0,0 +1,134 @@
+import asyncio
+
+import openai
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from fastapi import HTTPException
+
+from utils.chatgpt import cancel_on_disconnect, parse_batch_scores, score_against, score_pairs
+
+
+@pytest_asyncio.fixture
+async def fake_openai(monkeypatch):
+    """
+    Локальный сервер, отвечающий как /chat/completions OpenAI.
+    Текст ответа и задержка задаются через state.
+    """
+    state = {"reply": "42", "delay": 0.05, "in_flight": 0, "max_in_flight": 0, "calls": 0}
+
+    async def completions(request):
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(state["delay"])
+        finally:
+            state["in_flight"] -= 1
+        return web.json_response({
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": state["reply"]}}],
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    monkeypatch.setattr(openai, "api_base", f"http://127.0.0.1:{port}/v1")
+    monkeypatch.setattr(openai, "api_key", "test-key")
+    yield state
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_score_pairs_respects_concurrency_limit(fake_openai):
+    pairs = [("lost", f"found {i}") for i in range(10)]
+
+    scores = await score_pairs(pairs, concurrency=3)
+
+    assert scores == [42.0] * 10
+    assert fake_openai["calls"] == 10
+    assert fake_openai["max_in_flight"] <= 3
+
+
+@pytest.mark.asyncio
+async def test_score_pairs_timeout_gives_zero(fake_openai):
+    fake_openai["delay"] = 1.0
+
+    scores = await score_pairs([("lost", "found")], timeout=0.1)
+
+    assert scores == [0.0]
+
+
+@pytest.mark.asyncio
+async def test_score_pairs_unparsable_reply_gives_zero(fake_openai):
+    fake_openai["reply"] = "не знаю"
+
+    assert await score_pairs([("lost", "found")]) == [0.0]
+
+
+def test_parse_batch_scores():
+    assert parse_batch_scores("[90, 12.5, \"70%\"]", 3) == [90.0, 12.5, 70.0]
+    assert parse_batch_scores("```json\n[150, -3]\n```", 2) == [100.0, 0.0]
+    assert parse_batch_scores("[90, 10]", 3) is None
+    assert parse_batch_scores("не знаю", 1) is None
+    assert parse_batch_scores("[\"много\"]", 1) is None
+
+
+@pytest.mark.asyncio
+async def test_score_against_uses_one_call_per_batch(fake_openai):
+    fake_openai["reply"] = "[10, 20, 30]"
+
+    scores = await score_against("lost", ["a", "b", "c", "d", "e", "f"], batch_size=3)
+
+    assert scores == [10.0, 20.0, 30.0] * 2
+    assert fake_openai["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_score_against_falls_back_to_pairs_on_malformed_reply(fake_openai):
+    fake_openai["reply"] = "55"
+
+    scores = await score_against("lost", ["a", "b"], batch_size=2)
+
+    assert scores == [55.0, 55.0]
+    assert fake_openai["calls"] == 3  # одна пачка + две пары
+
+
+@pytest.mark.asyncio
+async def test_score_against_fallback_shares_concurrency_limit(fake_openai):
+    fake_openai["reply"] = "55"
+
+    scores = await score_against("lost", [f"found {i}" for i in range(8)], batch_size=2, concurrency=2)
+
+    assert scores == [55.0] * 8
+    assert fake_openai["max_in_flight"] <= 2
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+@pytest.mark.asyncio
+async def test_cancel_on_disconnect_cancels_work():
+    state = {"cancelled": False}
+
+    async def slow_scoring():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    with pytest.raises(HTTPException) as exc_info:
+        await cancel_on_disconnect(DisconnectedRequest(), slow_scoring(), poll_interval=0.01)
+
+    assert exc_info.value.status_code == 499
+    await asyncio.sleep(0)  # даём отменённой задаче обработать CancelledError
+    assert state["cancelled"]
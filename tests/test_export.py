@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from models import LostItem
+from utils.export import _csv_chunk, _ndjson_chunk, export_query
+
+
+def test_export_query_aggregates_tags_in_one_join():
+    sql = str(export_query(LostItem).compile(dialect=postgresql.dialect()))
+
+    assert "LEFT OUTER JOIN lostitem_tag" in sql
+    assert "json_agg" in sql
+    assert "GROUP BY lost_items.id" in sql
+    assert "search_vector" not in sql
+    assert "updated_at" not in sql  # как и в API (HIDDEN_FIELDS)
+
+
+def test_export_chunks():
+    rows = [{
+        "id": 1, "name": "Зонтик, чёрный", "lost_date": datetime(2025, 3, 12, 10, 0),
+        "tags": [{"id": 1, "name": "чёрный"}, {"id": 2, "name": "складной"}],
+    }]
+
+    assert _ndjson_chunk(rows) == (
+        '{"id": 1, "name": "Зонтик, чёрный", "lost_date": "2025-03-12T10:00:00", '
+        '"tags": [{"id": 1, "name": "чёрный"}, {"id": 2, "name": "складной"}]}\n'
+    )
+    assert _csv_chunk(rows, ["id", "name", "lost_date", "tags"], header=True).splitlines() == [
+        "id,name,lost_date,tags",
+        '1,"Зонтик, чёрный",2025-03-12T10:00:00,чёрный;складной',
+    ]
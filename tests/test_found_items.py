@@ -1,6 +1,7 @@
 import pytest
 import pytest_asyncio
-from models import FoundItem
+from models import Category, FoundItem
+from utils.similarity import get_found_index
 
 
 @pytest_asyncio.fixture
@@ -85,3 +86,88 @@ async def test_get_found_item_by_id_404(client):
 async def test_delete_found_item_404(client):
     response = await client.delete("/found_items/1")
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_found_item_single_round_trip(auth_client, test_db, statements):
+    category = Category(name="Документы")
+    test_db.add(category)
+    await test_db.commit()
+    await get_found_index(test_db)  # индекс загружается один раз на процесс
+    statements.clear()
+
+    response = await auth_client.post(
+        "/found_items/", json={"name": "Паспорт", "location": "вокзал", "category_id": category.id}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["tags"] == []
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT")
+
+
+@pytest.mark.asyncio
+async def test_create_found_item_unknown_category(auth_client):
+    response = await auth_client.post(
+        "/found_items/", json={"name": "Паспорт", "location": "вокзал", "category_id": 999}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Category not found"
+
+
+@pytest.mark.asyncio
+async def test_update_found_item_single_round_trip(auth_client, test_db, add_item, statements):
+    await get_found_index(test_db)  # индекс загружается один раз на процесс
+    statements.clear()
+
+    response = await auth_client.put(f"/found_items/{add_item.id}", json={"name": "Новое имя"})
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Новое имя"
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE")
+
+
+@pytest.mark.asyncio
+async def test_update_found_item_404(auth_client):
+    response = await auth_client.put("/found_items/999", json={"name": "Новое имя"})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_found_items(auth_client, test_db, statements):
+    category = Category(name="Документы")
+    test_db.add(category)
+    await test_db.commit()
+    rows = [{"name": f"Паспорт {i}", "location": "вокзал", "category_id": category.id} for i in range(3)]
+    rows.append({"name": "Без категории", "location": "вокзал", "category_id": 999})
+    rows.append({"location": "вокзал"})
+    statements.clear()
+
+    response = await auth_client.post("/found_items/bulk", json=rows)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 3
+    assert data["failed"] == 2
+    assert all(result["id"] for result in data["results"][:3])
+    assert data["results"][3]["error"] == "Category not found"
+    assert data["results"][4]["id"] is None
+    assert sum(statement.startswith("INSERT") for statement in statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_found_items_ndjson(auth_client, test_db):
+    category = Category(name="Ключи")
+    test_db.add(category)
+    await test_db.commit()
+    body = "\n".join(
+        f'{{"name": "Ключи {i}", "location": "парк", "category_id": {category.id}}}' for i in range(2)
+    )
+
+    response = await auth_client.post(
+        "/found_items/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
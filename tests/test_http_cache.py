@@ -0,0 +1,23 @@
+from starlette.requests import Request
+
+from utils.http_cache import etag_matches, make_etag
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def test_make_etag_changes_with_version():
+    assert make_etag(1, "2025-03-12T10:00:00", []) == make_etag(1, "2025-03-12T10:00:00", [])
+    assert make_etag(1, "2025-03-12T10:00:00", []) != make_etag(1, "2025-03-12T10:00:01", [])
+
+
+def test_etag_matches_if_none_match():
+    etag = make_etag(1)
+
+    assert etag_matches(make_request(etag), etag)
+    assert etag_matches(make_request(f'"other", W/{etag}'), etag)
+    assert etag_matches(make_request("*"), etag)
+    assert not etag_matches(make_request('"other"'), etag)
+    assert not etag_matches(make_request(), etag)
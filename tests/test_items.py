@@ -0,0 +1,53 @@
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from models import LostItem
+from utils.items import read_bulk_body, sparse_columns
+
+
+def compile_select(columns) -> str:
+    return str(select(*columns).compile(dialect=postgresql.dialect()))
+
+
+def test_sparse_columns_selects_only_requested_fields():
+    sql = compile_select(sparse_columns(LostItem, "name,location", None))
+
+    assert sql.startswith("SELECT lost_items.id, lost_items.name, lost_items.location \nFROM lost_items")
+    assert "description" not in sql
+    assert "tags" not in sql
+
+
+def test_sparse_columns_embeds_tags_and_sort_column():
+    sql = compile_select(sparse_columns(LostItem, "name", "tags", required=("lost_date",)))
+
+    assert "lost_items.lost_date" in sql
+    assert "json_agg" in sql
+    assert "updated_at" not in compile_select(sparse_columns(LostItem, None, "tags"))
+
+
+def test_sparse_columns_rejects_unknown_fields():
+    with pytest.raises(HTTPException) as exc:
+        sparse_columns(LostItem, "name,search_vector", None)
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        sparse_columns(LostItem, None, "category")
+
+
+def bulk_request(body: bytes, content_type: str) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "method": "POST", "headers": [(b"content-type", content_type.encode())]}
+    return Request(scope, receive)
+
+
+@pytest.mark.asyncio
+async def test_read_bulk_body_rejects_non_utf8_ndjson():
+    with pytest.raises(HTTPException) as exc_info:
+        await read_bulk_body(bulk_request(b'{"name": "\xff"}\n', "application/x-ndjson"))
+    assert exc_info.value.status_code == 400
+
+    rows = await read_bulk_body(bulk_request('{"name": "Ключи"}\nbad\n'.encode(), "application/x-ndjson"))
+    assert rows == [{"name": "Ключи"}, "bad"]
@@ -1,11 +1,20 @@
 import pytest
 import pytest_asyncio
-from models import LostItem
+from models import Category, FoundItem, ItemMatch, LostItem
+from utils.pagination import encode_cursor
 
 
 @pytest_asyncio.fixture
-async def add_item(test_db):
-    item = {"name": "TestLostItem1", "location": "test location"}
+async def category(test_db):
+    db_category = Category(name="Разное")
+    test_db.add(db_category)
+    await test_db.commit()
+    return db_category
+
+
+@pytest_asyncio.fixture
+async def add_item(test_db, category):
+    item = {"name": "TestLostItem1", "location": "test location", "category_id": category.id}
     db_item = LostItem(**item)
     test_db.add(db_item)
     await test_db.commit()
@@ -85,3 +94,215 @@ async def test_get_lost_item_by_id_404(client):
 async def test_delete_lost_item_404(client):
     response = await client.delete("/lost_items/1")
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_lost_item_single_round_trip(auth_client, test_db, statements):
+    category = Category(name="Документы")
+    test_db.add(category)
+    await test_db.commit()
+    statements.clear()
+
+    response = await auth_client.post(
+        "/lost_items/", json={"name": "Паспорт", "location": "вокзал", "category_id": category.id}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["tags"] == []
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT")
+
+
+@pytest.mark.asyncio
+async def test_create_lost_item_unknown_category(auth_client):
+    response = await auth_client.post(
+        "/lost_items/", json={"name": "Паспорт", "location": "вокзал", "category_id": 999}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Category not found"
+
+
+@pytest.mark.asyncio
+async def test_update_lost_item_single_round_trip(auth_client, test_db, add_item, statements):
+    statements.clear()
+
+    response = await auth_client.put(f"/lost_items/{add_item.id}", json={"name": "Новое имя"})
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Новое имя"
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE")
+
+
+@pytest.mark.asyncio
+async def test_update_lost_item_404(auth_client):
+    response = await auth_client.put("/lost_items/999", json={"name": "Новое имя"})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_lost_items(auth_client, test_db, statements):
+    category = Category(name="Документы")
+    test_db.add(category)
+    await test_db.commit()
+    rows = [{"name": f"Паспорт {i}", "location": "вокзал", "category_id": category.id} for i in range(3)]
+    rows.append({"name": "Без категории", "location": "вокзал", "category_id": 999})
+    rows.append({"location": "вокзал"})
+    statements.clear()
+
+    response = await auth_client.post("/lost_items/bulk", json=rows)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 3
+    assert data["failed"] == 2
+    assert all(result["id"] for result in data["results"][:3])
+    assert data["results"][3]["error"] == "Category not found"
+    assert data["results"][4]["id"] is None
+    assert sum(statement.startswith("INSERT") for statement in statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_lost_items_ndjson(auth_client, test_db):
+    category = Category(name="Ключи")
+    test_db.add(category)
+    await test_db.commit()
+    body = "\n".join(
+        f'{{"name": "Ключи {i}", "location": "парк", "category_id": {category.id}}}' for i in range(2)
+    )
+
+    response = await auth_client.post(
+        "/lost_items/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+
+
+@pytest.mark.asyncio
+async def test_export_lost_items_ndjson(client, add_item):
+    response = await client.get("/lost_items/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 1
+    assert '"tags": []' in lines[0]
+
+
+@pytest.mark.asyncio
+async def test_get_lost_item_not_modified(client, add_item):
+    response = await client.get(f"/lost_items/{add_item.id}")
+    etag = response.headers["etag"]
+
+    response = await client.get(f"/lost_items/{add_item.id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_get_lost_items_sparse_fields(client, add_item, statements):
+    statements.clear()
+
+    response = await client.get("/lost_items/", params={"fields": "name,location"})
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": add_item.id, "name": add_item.name, "location": add_item.location}]
+    assert len(statements) == 1
+
+    response = await client.get("/lost_items/", params={"fields": "name", "include": "tags"})
+    assert response.json() == [{"id": add_item.id, "name": add_item.name, "tags": []}]
+
+
+@pytest_asyncio.fixture
+async def lost_item_matches(test_db, add_item, category):
+    found_items = [
+        FoundItem(name=f"Находка {i}", location="вокзал", category_id=category.id) for i in range(5)
+    ]
+    test_db.add_all(found_items)
+    await test_db.commit()
+    # Две находки с одинаковой оценкой — порядок между ними по found_item_id
+    scores = [80.0, 90.0, 10.0, 80.0, 50.0]
+    test_db.add_all([
+        ItemMatch(lost_item_id=add_item.id, found_item_id=item.id, score=score)
+        for item, score in zip(found_items, scores)
+    ])
+    await test_db.commit()
+    return [item.id for item in found_items]
+
+
+@pytest.mark.asyncio
+async def test_lost_item_matches_keyset_pages(client, add_item, lost_item_matches):
+    ids = lost_item_matches
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(f"/lost_items/{add_item.id}/matches", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        pages.append([(match["found_item"]["id"], match["score"]) for match in data["items"]])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == [
+        [(ids[1], 90.0), (ids[0], 80.0)],
+        [(ids[3], 80.0), (ids[4], 50.0)],
+        [(ids[2], 10.0)],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_lost_item_matches_min_score(client, add_item, lost_item_matches):
+    response = await client.get(f"/lost_items/{add_item.id}/matches", params={"min_score": 50})
+
+    scores = [match["score"] for match in response.json()["items"]]
+    assert scores == [90.0, 80.0, 80.0, 50.0]
+    assert response.json()["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_lost_item_matches_bad_cursor(client, add_item):
+    response = await client.get(f"/lost_items/{add_item.id}/matches", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+    # Корректный base64/JSON, но значения не тех типов
+    response = await client.get(
+        f"/lost_items/{add_item.id}/matches", params={"cursor": encode_cursor("abc", 1)}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_lost_items_russian_stemming(client, test_db, category):
+    test_db.add_all([
+        LostItem(name="Синие перчатки", location="Казанский вокзал", category_id=category.id),
+        LostItem(name="Зонт", location="парк", category_id=category.id),
+    ])
+    await test_db.commit()
+
+    response = await client.get("/lost_items/", params={"q": "перчатка"})
+    assert [item["name"] for item in response.json()] == ["Синие перчатки"]
+
+    response = await client.get("/lost_items/", params={"location": "вокзал"})
+    assert [item["name"] for item in response.json()] == ["Синие перчатки"]
+
+
+@pytest.mark.asyncio
+async def test_search_lost_items_ranked_by_relevance(client, test_db, category):
+    # Менее релевантный предмет добавляем первым, чтобы порядок не совпал с id
+    test_db.add(LostItem(
+        name="Сумка", description="внутри были ключи", location="метро", category_id=category.id,
+    ))
+    await test_db.commit()
+    test_db.add(LostItem(
+        name="Ключи", description="ключи от машины и ключи от дома", location="метро",
+        category_id=category.id,
+    ))
+    await test_db.commit()
+
+    response = await client.get("/lost_items/", params={"q": "ключи"})
+
+    assert [item["name"] for item in response.json()] == ["Ключи", "Сумка"]
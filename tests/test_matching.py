@@ -0,0 +1,119 @@
+import pytest
+import pytest_asyncio
+from faststream.rabbit import TestRabbitBroker
+from sqlalchemy import select
+
+import main
+from broker import ITEMS_CHANGED_QUEUE, router
+from config import settings
+from models import Category, FoundItem, ItemMatch, LostItem
+from utils.matching import match_found_item, match_lost_item
+
+
+@pytest_asyncio.fixture
+async def category(test_db):
+    category = Category(name="Кошельки")
+    test_db.add(category)
+    await test_db.commit()
+    return category
+
+
+async def stored_matches(test_db, lost_item_id):
+    result = await test_db.execute(
+        select(ItemMatch.found_item_id)
+        .where(ItemMatch.lost_item_id == lost_item_id)
+        .order_by(ItemMatch.score.desc(), ItemMatch.found_item_id)
+    )
+    return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_match_lost_item_keeps_top_n(test_db, category, monkeypatch):
+    monkeypatch.setattr(settings, "match_top_n", 2)
+    lost_item = LostItem(name="Чёрный кожаный кошелёк", location="метро", category_id=category.id)
+    found_items = [
+        FoundItem(name="Чёрный кожаный кошелёк", location="метро", category_id=category.id),
+        FoundItem(name="Кожаный кошелёк", location="метро", category_id=category.id),
+        FoundItem(name="Чёрный кошелёк", location="вокзал", category_id=category.id),
+        FoundItem(name="Зонт-трость", location="парк", category_id=category.id),
+    ]
+    test_db.add_all([lost_item, *found_items])
+    await test_db.commit()
+
+    await match_lost_item(test_db, lost_item.id)
+
+    matches = await stored_matches(test_db, lost_item.id)
+    assert len(matches) == 2
+    assert matches[0] == found_items[0].id
+    assert found_items[3].id not in matches
+
+
+@pytest.mark.asyncio
+async def test_match_found_item_trims_lost_item_matches(test_db, category, monkeypatch):
+    monkeypatch.setattr(settings, "match_top_n", 1)
+    lost_item = LostItem(name="Чёрный кожаный кошелёк", location="метро", category_id=category.id)
+    old_found = FoundItem(name="Кошелёк", location="вокзал", category_id=category.id)
+    new_found = FoundItem(name="Чёрный кожаный кошелёк", location="метро", category_id=category.id)
+    test_db.add_all([lost_item, old_found, new_found])
+    await test_db.commit()
+    test_db.add(ItemMatch(lost_item_id=lost_item.id, found_item_id=old_found.id, score=30.0))
+    await test_db.commit()
+
+    await match_found_item(test_db, new_found.id)
+
+    assert await stored_matches(test_db, lost_item.id) == [new_found.id]
+
+
+@pytest.mark.asyncio
+async def test_compute_item_matches_dispatches_by_kind(monkeypatch):
+    calls = []
+
+    def record(kind):
+        async def match(db, item_id):
+            calls.append((kind, item_id))
+        return match
+
+    monkeypatch.setattr(main, "match_lost_item", record("lost"))
+    monkeypatch.setattr(main, "match_found_item", record("found"))
+
+    async with TestRabbitBroker(router.broker) as broker:
+        await broker.publish({"kind": "lost", "id": 1}, queue=ITEMS_CHANGED_QUEUE)
+        await broker.publish({"kind": "found", "id": 2}, queue=ITEMS_CHANGED_QUEUE)
+
+    assert calls == [("lost", 1), ("found", 2)]
+
+
+@pytest.mark.asyncio
+async def test_similar_items_served_from_empty_precomputed_matches(client, test_db, category, monkeypatch):
+    monkeypatch.setattr(settings, "match_min_score", 100.0)
+    lost_item = LostItem(name="Чёрный кожаный кошелёк", location="метро", category_id=category.id)
+    found_item = FoundItem(name="Зонт-трость", location="парк", category_id=category.id)
+    test_db.add_all([lost_item, found_item])
+    await test_db.commit()
+
+    await match_lost_item(test_db, lost_item.id)
+    assert await stored_matches(test_db, lost_item.id) == []
+
+    async def fail(db):
+        raise AssertionError("matches must not be recomputed")
+
+    # Совпадения уже посчитаны (пусто) — на лету не пересчитываем
+    monkeypatch.setattr("routers.lost_items.get_found_index", fail)
+    test_db.expire_all()
+    response = await client.get(f"/lost_items/{lost_item.id}/similar_found_items")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_similar_items_top_k_limited_by_precomputed_matches(client, test_db, category):
+    lost_item = LostItem(name="Чёрный кожаный кошелёк", location="метро", category_id=category.id)
+    test_db.add(lost_item)
+    await test_db.commit()
+    url = f"/lost_items/{lost_item.id}/similar_found_items"
+
+    response = await client.get(url, params={"top_k": settings.match_top_n + 1})
+    assert response.status_code == 400
+
+    response = await client.get(url, params={"top_k": settings.match_top_n + 1, "precomputed": False})
+    assert response.status_code == 200
@@ -0,0 +1,52 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from models import LostItem
+from utils.pagination import (
+    decode_cursor, encode_cursor, keyset_paginate, sort_column, split_page
+)
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("2025-03-12 10:00:00", 42)
+    assert decode_cursor(token, 2) == ["2025-03-12 10:00:00", 42]
+
+
+def test_invalid_cursor():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor", 2)
+    assert exc.value.status_code == 400
+
+
+def test_sort_column_rejects_relationships():
+    assert sort_column(LostItem, None) is LostItem.id
+    with pytest.raises(HTTPException):
+        sort_column(LostItem, "tags")
+
+
+def test_keyset_paginate_seeks_after_cursor():
+    cursor = encode_cursor(datetime(2025, 3, 12, 10, 0), 42)
+    query = keyset_paginate(
+        select(LostItem), LostItem.lost_date, LostItem.id,
+        sort_desc=True, cursor=cursor, limit=10,
+    )
+    sql = str(query.compile(dialect=postgresql.dialect()))
+
+    assert "(lost_items.lost_date, lost_items.id) < (" in sql
+    assert "ORDER BY lost_items.lost_date DESC, lost_items.id DESC" in sql
+    assert "OFFSET" not in sql
+
+
+def test_split_page():
+    rows = [SimpleNamespace(id=i, name=f"item {i}") for i in range(1, 5)]
+
+    page, next_cursor = split_page(rows, 3, "name")
+
+    assert [row.id for row in page] == [1, 2, 3]
+    assert decode_cursor(next_cursor, 2) == ["item 3", 3]
+    assert split_page(rows, 4, "name") == (rows, None)
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from utils.similarity import VectorIndex, item_vector
+
+
+def make_item(item_id, name, description="", category_id=1, tag_ids=()):
+    tags = [SimpleNamespace(id=tag_id, name=f"tag{tag_id}") for tag_id in tag_ids]
+    return SimpleNamespace(
+        id=item_id, name=name, description=description,
+        category_id=category_id, tags=tags,
+    )
+
+
+def test_item_vector_is_normalized():
+    vector = item_vector("Паспорт", "коричневая обложка", 1, [2])
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+
+
+def test_search_ranks_most_similar_first():
+    index = VectorIndex.build([
+        make_item(1, "Зонтик", "чёрный складной", category_id=3),
+        make_item(2, "Паспорт РФ", "коричневая обложка", category_id=1, tag_ids=[7]),
+        make_item(3, "Ключи", "связка из трёх ключей", category_id=5),
+    ])
+    query = item_vector("Паспорт", "обложка коричневого цвета", 1, [7])
+
+    results = index.search(query, top_k=2)
+
+    assert len(results) == 2
+    assert results[0][0] == 2
+    assert results[0][1] > results[1][1]
+    assert all(0.0 <= score <= 1.0 for _, score in results)
+
+
+def test_search_empty_index():
+    assert VectorIndex().search(item_vector("Зонтик", "", 1, []), top_k=5) == []
+
+
+def test_incremental_updates_are_persisted(tmp_path):
+    path = str(tmp_path / "found_index")
+    index = VectorIndex.build([make_item(1, "Зонтик"), make_item(2, "Ключи")], path=path)
+
+    index.upsert(3, item_vector("Паспорт", "", 1, []))
+    index.upsert(1, item_vector("Кошелёк", "кожаный", 2, []))
+    index.remove(2)
+
+    reopened = VectorIndex(path)
+    assert reopened.load()
+    assert sorted(reopened.ids.tolist()) == [1, 3]
+    assert reopened.search(item_vector("Кошелёк", "кожаный", 2, []), top_k=1)[0][0] == 1
+
+
+def test_index_files_locked_by_one_process(tmp_path):
+    path = str(tmp_path / "found_index")
+    owner = VectorIndex(path)
+    owner.lock()
+
+    # flock на отдельном открытом файле конфликтует и внутри одного процесса
+    with pytest.raises(RuntimeError):
+        VectorIndex(path).lock()
+
+
+def test_search_only_among_candidates():
+    index = VectorIndex.build([
+        make_item(1, "Паспорт РФ", category_id=1),
+        make_item(2, "Паспорт иностранный", category_id=1),
+        make_item(3, "Зонтик", category_id=3),
+    ])
+
+    results = index.search(item_vector("Паспорт РФ", "", 1, []), top_k=5, candidate_ids=[2, 3, 99])
+
+    assert [item_id for item_id, _ in results] == [2, 3]
@@ -0,0 +1,31 @@
+import schemas
+from utils.tag_index import TagIndex
+
+
+def make_index(*names):
+    return TagIndex([schemas.TagRead(id=i, name=name) for i, name in enumerate(names, start=1)])
+
+
+def test_page_walks_tags_by_id():
+    index = make_index("a", "b", "c", "d", "e")
+
+    page, last_id = index.page(None, 2)
+    assert [tag.id for tag in page] == [1, 2]
+    page, last_id = index.page(last_id, 2)
+    assert [tag.id for tag in page] == [3, 4]
+    page, last_id = index.page(last_id, 2)
+    assert [tag.id for tag in page] == [5]
+    assert last_id is None
+
+
+def test_autocomplete_by_prefix_ignores_case():
+    index = make_index("Паспорт", "пакет", "Зонтик", "паспортная обложка", "Ключи")
+
+    assert [tag.name for tag in index.autocomplete("пас", 10)] == ["Паспорт", "паспортная обложка"]
+    assert [tag.name for tag in index.autocomplete("па", 1)] == ["пакет"]
+    assert index.autocomplete("я", 10) == []
+
+
+def test_etag_changes_with_tags():
+    assert make_index("a", "b").etag == make_index("a", "b").etag
+    assert make_index("a", "b").etag != make_index("a", "c").etag
@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import update
+
+from models import Category, FoundItem, LostItem, Tag
+from utils.tag_usage import reconcile_tag_usage
+
+
+@pytest.mark.asyncio
+async def test_bulk_attach_and_detach_tag(auth_client, test_db, statements):
+    category = Category(name="Документы")
+    tag = Tag(name="паспорт")
+    test_db.add_all([category, tag])
+    await test_db.commit()
+    lost_items = [LostItem(name=f"Паспорт {i}", location="вокзал", category_id=category.id) for i in range(3)]
+    found_item = FoundItem(name="Паспорт", location="вокзал", category_id=category.id)
+    test_db.add_all([*lost_items, found_item])
+    await test_db.commit()
+    lost_ids = [item.id for item in lost_items]
+    statements.clear()
+
+    response = await auth_client.post(
+        f"/tags/{tag.id}/attach",
+        json={"lost_item_ids": [*lost_ids, 999], "found_item_ids": [found_item.id]},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"lost_items": 3, "found_items": 1}
+    assert sum(statement.startswith("INSERT") for statement in statements) == 2
+
+    # Повторная привязка ничего не меняет
+    response = await auth_client.post(f"/tags/{tag.id}/attach", json={"lost_item_ids": lost_ids})
+    assert response.json() == {"lost_items": 0, "found_items": 0}
+
+    response = await auth_client.post(f"/tags/{tag.id}/detach", json={"lost_item_ids": lost_ids[:2]})
+    assert response.json() == {"lost_items": 2, "found_items": 0}
+
+
+@pytest.mark.asyncio
+async def test_bulk_attach_publishes_item_changes(auth_client, test_db, monkeypatch):
+    published = []
+
+    async def record(kind, item_id):
+        published.append((kind, item_id))
+
+    monkeypatch.setattr("routers.tags.publish_item_changed", record)
+    category = Category(name="Документы")
+    tag = Tag(name="паспорт")
+    test_db.add_all([category, tag])
+    await test_db.commit()
+    lost_item = LostItem(name="Паспорт", location="вокзал", category_id=category.id)
+    found_item = FoundItem(name="Паспорт", location="вокзал", category_id=category.id)
+    test_db.add_all([lost_item, found_item])
+    await test_db.commit()
+
+    await auth_client.post(
+        f"/tags/{tag.id}/attach",
+        json={"lost_item_ids": [lost_item.id], "found_item_ids": [found_item.id]},
+    )
+    assert published == [("lost", lost_item.id), ("found", found_item.id)]
+
+    published.clear()
+    await auth_client.post(f"/tags/{tag.id}/detach", json={"found_item_ids": [found_item.id]})
+    assert published == [("found", found_item.id)]
+
+
+@pytest.mark.asyncio
+async def test_bulk_attach_unknown_tag(auth_client, test_db):
+    category = Category(name="Ключи")
+    test_db.add(category)
+    await test_db.commit()
+    item = LostItem(name="Ключи", location="парк", category_id=category.id)
+    test_db.add(item)
+    await test_db.commit()
+
+    response = await auth_client.post("/tags/999/attach", json={"lost_item_ids": [item.id]})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_usage_count_popular_and_reconcile(auth_client, test_db):
+    category = Category(name="Документы")
+    common, rare = Tag(name="документ"), Tag(name="редкий")
+    test_db.add_all([category, common, rare])
+    await test_db.commit()
+    items = [LostItem(name=f"Паспорт {i}", location="вокзал", category_id=category.id) for i in range(3)]
+    test_db.add_all(items)
+    await test_db.commit()
+    item_ids = [item.id for item in items]
+
+    await auth_client.post(f"/tags/{common.id}/attach", json={"lost_item_ids": item_ids})
+    await auth_client.post(f"/tags/{rare.id}/attach", json={"lost_item_ids": item_ids[:1]})
+    await auth_client.post(f"/tags/{common.id}/detach", json={"lost_item_ids": item_ids[:1]})
+
+    # Клиент работает в той же сессии (expire_on_commit=False): счётчики
+    # меняют триггеры в базе, поэтому закэшированные объекты тегов сбрасываем
+    test_db.expire_all()
+    response = await auth_client.get("/tags/popular")
+    assert [(tag["name"], tag["usage_count"]) for tag in response.json()] == [
+        ("документ", 2), ("редкий", 1),
+    ]
+
+    await test_db.execute(update(Tag).values(usage_count=100))
+    await test_db.commit()
+    assert await reconcile_tag_usage(test_db) == 2
+    test_db.expire_all()
+    response = await auth_client.get("/tags/popular")
+    assert [tag["usage_count"] for tag in response.json()] == [2, 1]